@@ -1,19 +1,10 @@
 # gemini_service.py
-import google.generativeai as genai
 import os
 import asyncio
 import json
 from concurrent.futures import ThreadPoolExecutor
-from openai import AsyncOpenAI
-
-
-# --- Configuration & Initialization ---
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable not set.")
-
-# Initialize the async client
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+from functools import lru_cache
+from app.aimodels.openai_service import get_client
 
 # --- New Function ---
 
@@ -23,7 +14,7 @@ async def generate_structured_response_openai(prompt: str) -> str:
     This function uses OpenAI's JSON mode for reliable output.
     """
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-3.5-turbo",  # Or "gpt-3.5-turbo" for a faster, cheaper option
             response_format={"type": "json_object"},
             messages=[
@@ -47,12 +38,25 @@ async def generate_structured_response_openai(prompt: str) -> str:
 
 # --- Configuration & Initialization ---
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY environment variable not set.")
-genai.configure(api_key=GEMINI_API_KEY)
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
 
-# Use a longer-lived model for better context in chats
-model = genai.GenerativeModel("gemini-1.5-pro-latest")
+
+@lru_cache(maxsize=1)
+def get_model():
+    """
+    Configures google-generativeai and builds the model on first use, so a missing
+    key only fails the Gemini calls instead of the whole app import.
+    """
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY environment variable not set.")
+    import google.generativeai as genai
+    if GEMINI_API_ENDPOINT:
+        # Point the SDK at a non-default host (e.g. a local stand-in for load tests)
+        genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+    # Use a longer-lived model for better context in chats
+    return genai.GenerativeModel("gemini-1.5-pro-latest")
 
 # A simple in-memory store for active chat sessions.
 # Key: user_id (str), Value: ChatSession object
@@ -71,7 +75,7 @@ async def generate_structured_response(prompt: str) -> str:
         with ThreadPoolExecutor() as pool:
             response = await loop.run_in_executor(
                 pool,
-                lambda: model.generate_content(prompt)
+                lambda: get_model().generate_content(prompt)
             )
         return response.text
     except Exception as e:
@@ -93,7 +97,7 @@ async def get_chat_response(user_id: str, user_message: str) -> str:
         If a user asks a question unrelated to finance, politely steer the conversation back to financial topics.
         Keep your answers concise and easy to understand.
         """
-        chat_sessions[user_id] = model.start_chat(
+        chat_sessions[user_id] = get_model().start_chat(
             history=[],
             # The system instruction is a better way to set the persona
             # We can now set it using the 'system_instruction' parameter with GenerativeModel
@@ -1,13 +1,22 @@
 import os
 import json
-from openai import AsyncOpenAI, APIStatusError
+from functools import lru_cache
+from app.aimodels.query_cache import chat_answer_cache
 
 # --- Configuration & Initialization ---
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable not set.")
 
-client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+@lru_cache(maxsize=1)
+def get_client():
+    """
+    Builds the AsyncOpenAI client on first use. The SDK is only imported here so
+    that importing the app stays cheap and does not need credentials.
+    """
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable not set.")
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 # --- In-memory store for chat histories ---
 # Key: user_id (str), Value: list of message objects
@@ -21,7 +30,7 @@ async def generate_structured_response_openai(prompt: str) -> str:
     This function does NOT use chat history.
     """
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o",
             response_format={"type": "json_object"},
             messages=[
@@ -41,6 +50,7 @@ async def get_chat_response_openai(user_id: str, user_message: str) -> str:
     Handles conversational chat, maintaining history for each user.
     """
     global chat_histories
+    from openai import APIStatusError
 
     # Retrieve or initialize the chat history for the user
     if user_id not in chat_histories:
@@ -56,11 +66,21 @@ async def get_chat_response_openai(user_id: str, user_message: str) -> str:
             }
         ]
 
+    # Only the opening question of a conversation is answered from / saved to the shared cache;
+    # later turns depend on the conversation so far.
+    first_turn = len(chat_histories[user_id]) == 1
+    if first_turn:
+        cached_reply = chat_answer_cache.lookup(user_message)
+        if cached_reply:
+            chat_histories[user_id].append({"role": "user", "content": user_message})
+            chat_histories[user_id].append({"role": "assistant", "content": cached_reply})
+            return cached_reply
+
     # Add the new user message to the history
     chat_histories[user_id].append({"role": "user", "content": user_message})
 
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o", # Using a powerful model for good conversation
             messages=chat_histories[user_id] # Send the entire history
         )
@@ -69,6 +89,8 @@ async def get_chat_response_openai(user_id: str, user_message: str) -> str:
 
         # Add the assistant's reply to the history for future context
         chat_histories[user_id].append({"role": "assistant", "content": assistant_reply})
+        if first_turn:
+            chat_answer_cache.store(user_message, assistant_reply)
 
         return assistant_reply
 
@@ -0,0 +1,277 @@
+# query_cache.py
+"""
+Opt-in answer cache for generic, first-turn chat questions ("what is SIP",
+"ELSS vs PPF"). Queries are matched by an exact hash of their normalized text
+and, failing that, by MinHash signatures over character shingles looked up
+through an LSH band index, so a misspelled word still hits. Word order, filler
+words and plurals are already folded into the exact key. A near-duplicate is
+only accepted when it asks about the same content words: "80C" vs "80D" or
+"repo" vs "reverse repo" must never share an answer.
+
+Only non-personalized questions are cached, and answers that refer to the
+user's own data are never stored.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+# --- Configuration ---
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+CHAT_CACHE_TTL_SECONDS = int(os.getenv("CHAT_CACHE_TTL_SECONDS", 24 * 60 * 60))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", 1000))
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", 0.8))
+
+NUM_PERMUTATIONS = 64
+BANDS = 16  # 16 bands x 4 rows: near-certain candidate match at Jaccard >= 0.8
+SHINGLE_SIZE = 3
+MIN_TYPO_WORD_LENGTH = 6  # shorter words ("more"/"less") must match exactly
+_MERSENNE_PRIME = (1 << 61) - 1
+
+# Filler words that don't change what is being asked
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "what", "whats", "which", "who", "how", "does", "do", "can", "could",
+    "would", "should", "you", "please", "explain", "define", "definition", "meaning", "mean", "means", "tell",
+    "about", "of", "for", "to", "in", "on", "and", "or", "it", "its", "this", "that", "there", "some", "me",
+    # comparison wording: "ELSS vs PPF", "difference between ELSS and PPF", "which is better, PPF or ELSS"
+    "vs", "versus", "difference", "between", "compare", "comparison", "compared", "with", "better",
+}
+# Politeness phrases stripped before the personal-pronoun check ("tell me what SIP is" is still generic)
+FILLER_PHRASES = re.compile(r"\b(tell me|explain to me|help me understand|can you|could you|please)\b")
+PERSONAL_QUERY = re.compile(
+    r"\b(i|me|my|mine|myself|we|our|ours|us|im|ive|id)\b"
+    r"|(₹|\brs\.?|\binr)\s*\d|\d[\d,]{3,}|\b\d+(\.\d+)?\s*(k|lakh|lakhs|lac|crore|crores|cr)\b"
+)
+PERSONAL_ANSWER = re.compile(
+    r"\byour (account|transactions?|spending|expenses?|balance|salary|income|savings|portfolio|statements?|profile|history)\b"
+    r"|\bbased on (your|the) (data|transactions?|statements?|history)\b",
+    re.I,
+)
+
+
+def normalize_query(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"['’]", "", text)
+    text = re.sub(r"[^\w\s₹]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _stem(word: str) -> str:
+    # Plural folding only: "sips" -> "sip", "funds" -> "fund"
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def content_words(normalized: str) -> List[str]:
+    """Normalized query minus filler words, lightly stemmed, deduplicated and sorted."""
+    return sorted({_stem(w) for w in normalized.split() if w not in STOPWORDS})
+
+
+def canonical_query(normalized: str) -> str:
+    """
+    Content words joined so that word order doesn't matter. This is what gets
+    hashed and shingled.
+    """
+    return " ".join(content_words(normalized)) or normalized
+
+
+def _one_edit_apart(a: str, b: str) -> bool:
+    """True if one substitution, insertion, deletion or adjacent swap turns `a` into `b`."""
+    if abs(len(a) - len(b)) > 1 or a == b:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    return a[i + 1:] == b[i + 1:] or (a[i + 2:] == b[i + 2:] and a[i:i + 2] == b[i:i + 2][::-1])
+
+
+def same_question(words_a: List[str], words_b: List[str]) -> bool:
+    """
+    Whether two near-duplicate queries ask the same thing: identical content
+    words, except for at most one misspelling of a long word without digits.
+    """
+    only_a, only_b = set(words_a) - set(words_b), set(words_b) - set(words_a)
+    if not only_a and not only_b:
+        return True
+    if len(only_a) != 1 or len(only_b) != 1:
+        return False
+    a, b = only_a.pop(), only_b.pop()
+    if min(len(a), len(b)) < MIN_TYPO_WORD_LENGTH or any(c.isdigit() for c in a + b):
+        return False
+    return _one_edit_apart(a, b)
+
+
+def is_personal_query(normalized: str) -> bool:
+    return bool(PERSONAL_QUERY.search(FILLER_PHRASES.sub(" ", normalized)))
+
+
+def is_personal_answer(answer: str) -> bool:
+    return bool(PERSONAL_ANSWER.search(answer or ""))
+
+
+def _shingles(text: str) -> Set[str]:
+    padded = f" {text} "
+    if len(padded) <= SHINGLE_SIZE:
+        return {padded}
+    return {padded[i:i + SHINGLE_SIZE] for i in range(len(padded) - SHINGLE_SIZE + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERMUTATIONS, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, text: str) -> List[int]:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in _shingles(text)]
+        return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self.params]
+
+    @staticmethod
+    def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+        """Estimated Jaccard similarity: share of matching signature slots."""
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class QueryCache:
+    """TTL + LRU bounded cache of chat answers with exact and near-duplicate lookup."""
+
+    def __init__(self, enabled: bool = CHAT_CACHE_ENABLED, ttl_seconds: int = CHAT_CACHE_TTL_SECONDS,
+                 max_entries: int = CHAT_CACHE_MAX_ENTRIES, similarity: float = CHAT_CACHE_SIMILARITY):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity
+        self.hasher = MinHasher()
+        self.rows_per_band = NUM_PERMUTATIONS // BANDS
+        # key -> {"query", "words", "answer", "signature", "bands", "expires_at", "hits"}; order = LRU
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._bands: Dict[tuple, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0, "skipped": 0,
+                      "stores": 0, "rejected_answers": 0, "evictions": 0, "expirations": 0}
+
+    # --- Internals ---
+    def _band_keys(self, signature: List[int]) -> List[tuple]:
+        r = self.rows_per_band
+        return [(i, tuple(signature[i * r:(i + 1) * r])) for i in range(BANDS)]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if not entry:
+            return
+        for band in entry["bands"]:
+            bucket = self._bands.get(band)
+            if bucket:
+                bucket.discard(key)
+                if not bucket:
+                    del self._bands[band]
+
+    def _live(self, key: str, now: float) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry and entry["expires_at"] <= now:
+            self._remove(key)
+            self.stats["expirations"] += 1
+            return None
+        return entry
+
+    @staticmethod
+    def _key(canonical: str) -> str:
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    # --- Public API ---
+    def lookup(self, query: str) -> Optional[str]:
+        """Returns a cached answer for `query`, or None. Personal questions always miss."""
+        if not self.enabled:
+            return None
+        normalized = normalize_query(query)
+        with self._lock:
+            self.stats["lookups"] += 1
+            if is_personal_query(normalized):
+                self.stats["skipped"] += 1
+                return None
+            now = time.time()
+            words = content_words(normalized)
+            canonical = canonical_query(normalized)
+            key = self._key(canonical)
+
+            entry = self._live(key, now)
+            if entry:
+                self.stats["exact_hits"] += 1
+            else:
+                signature = self.hasher.signature(canonical)
+                candidates = set()
+                for band in self._band_keys(signature):
+                    candidates |= self._bands.get(band, set())
+                best, best_score = None, 0.0
+                for candidate in candidates:
+                    cand_entry = self._live(candidate, now)
+                    if not cand_entry or not same_question(words, cand_entry["words"]):
+                        continue
+                    score = MinHasher.similarity(signature, cand_entry["signature"])
+                    if score > best_score:
+                        best, best_score = candidate, score
+                if best is None or best_score < self.similarity_threshold:
+                    self.stats["misses"] += 1
+                    return None
+                key, entry = best, self._entries[best]
+                self.stats["similar_hits"] += 1
+
+            self._entries.move_to_end(key)
+            entry["hits"] += 1
+            return entry["answer"]
+
+    def store(self, query: str, answer: str) -> bool:
+        """Caches `answer` for `query` if both are generic. Returns True when stored."""
+        if not self.enabled or not answer:
+            return False
+        normalized = normalize_query(query)
+        if is_personal_query(normalized):
+            return False
+        with self._lock:
+            if is_personal_answer(answer):
+                self.stats["rejected_answers"] += 1
+                return False
+            canonical = canonical_query(normalized)
+            key = self._key(canonical)
+            self._remove(key)
+            signature = self.hasher.signature(canonical)
+            bands = self._band_keys(signature)
+            self._entries[key] = {"query": canonical, "words": content_words(normalized), "answer": answer, "signature": signature, "bands": bands,
+                                  "expires_at": time.time() + self.ttl_seconds, "hits": 0}
+            for band in bands:
+                self._bands.setdefault(band, set()).add(key)
+            self.stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats["evictions"] += 1
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bands.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            hits = self.stats["exact_hits"] + self.stats["similar_hits"]
+            lookups = self.stats["lookups"]
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                **self.stats,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Shared instance used by the chat service
+chat_answer_cache = QueryCache()
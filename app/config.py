@@ -1,10 +1,19 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from supabase import create_client
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Heavy startup work (client construction, parser imports) is deferred until first use
+# unless WARMUP_ON_STARTUP is set, in which case the lifespan hook in main.py does it.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+
+@lru_cache(maxsize=1)
+def get_supabase():
+    """Builds the Supabase client on first use and reuses it afterwards."""
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
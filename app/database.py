@@ -1,8 +1,101 @@
-from app.config import supabase
+from datetime import datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from app.config import get_supabase
+
+# Columns returned by the transaction read APIs (avoid select("*") on large histories)
+TRANSACTION_COLUMNS = "id,txn_date,description,debit,credit,amount,balance,category,anomaly"
+TRANSACTION_PAGE_SIZE = 1000
 
 def get_user_by_id(user_id: str):
-    return supabase.table("users").select("*").eq("id", user_id).execute()
+    return get_supabase().table("users").select("*").eq("id", user_id).execute()
+
+def query_transactions(
+    user_id: str,
+    columns: str = TRANSACTION_COLUMNS,
+    limit: int = 100,
+    after: Optional[Tuple[str, object]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    category: Optional[str] = None,
+    direction: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+) -> List[dict]:
+    """
+    One page of a user's transactions ordered by (txn_date, id), with every filter
+    applied by the database. `after` is the (txn_date, id) of the last row of the
+    previous page (keyset pagination, so deep pages cost the same as the first).
+
+    min_amount/max_amount filter the debit or credit value when a direction is
+    given, and the size of the signed amount otherwise.
+    """
+    query = get_supabase().table("transactions").select(columns).eq("user_id", user_id)
+    if start_date:
+        query = query.gte("txn_date", start_date)
+    if end_date:
+        query = query.lte("txn_date", end_date)
+    if category:
+        query = query.eq("category->>category", category)
+
+    # Each entry is the body of one or=(...) condition; several are ANDed together
+    conditions = []
+    if direction:
+        amount_column = "debit" if direction == "debit" else "credit"
+        query = query.lt("amount", 0) if direction == "debit" else query.gt("amount", 0)
+        if min_amount is not None:
+            query = query.gte(amount_column, min_amount)
+        if max_amount is not None:
+            query = query.lte(amount_column, max_amount)
+    else:
+        # Size of the transaction whatever its sign (debits are stored negative)
+        if min_amount is not None:
+            conditions.append(f"amount.gte.{min_amount},amount.lte.{-min_amount}")
+        if max_amount is not None:
+            query = query.gte("amount", -max_amount).lte("amount", max_amount)
+
+    if after:
+        last_date, last_id = after
+        conditions.append(f"txn_date.gt.{last_date},and(txn_date.eq.{last_date},id.gt.{last_id})")
+    if len(conditions) == 1:
+        query = query.or_(conditions[0])
+    elif conditions:
+        query = query.or_("and(" + ",".join(f"or({c})" for c in conditions) + ")")
+    return query.order("txn_date").order("id").limit(limit).execute().data
+
+def iter_transactions(user_id: str, columns: str = TRANSACTION_COLUMNS, page_size: int = TRANSACTION_PAGE_SIZE, **filters) -> Iterator[List[dict]]:
+    """Yields a user's transactions page by page. `columns` must include txn_date and id."""
+    after = None
+    while True:
+        page = query_transactions(user_id, columns=columns, limit=page_size, after=after, **filters)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = (page[-1]["txn_date"], page[-1]["id"])
+
+def get_transactions(user_id: str, columns: str = TRANSACTION_COLUMNS, **filters) -> List[dict]:
+    rows = []
+    for page in iter_transactions(user_id, columns=columns, **filters):
+        rows.extend(page)
+    return rows
+
+def get_spending_stats(user_id: str) -> Tuple[Optional[dict], Optional[str]]:
+    """The user's anomaly statistics and their updated_at, which acts as the row version."""
+    response = get_supabase().table("user_spending_stats").select("stats,updated_at").eq("user_id", user_id).limit(1).execute()
+    if not response.data:
+        return None, None
+    return response.data[0]["stats"], response.data[0]["updated_at"]
 
-def get_transactions(user_id: str):
-    return {"table": "coming soon"}
-    # return supabase.table("transactions").select("*").eq("user_id", user_id).execute()
+def save_spending_stats(user_id: str, stats: dict, expected_updated_at: Optional[str]) -> bool:
+    """
+    Writes the stats only if nobody else has since `get_spending_stats` returned
+    `expected_updated_at` (None: only if the user has no row yet).
+    Returns False on a concurrent update; the caller re-reads and merges.
+    """
+    row = {"user_id": user_id, "stats": stats, "updated_at": datetime.now(timezone.utc).isoformat()}
+    table = get_supabase().table("user_spending_stats")
+    if expected_updated_at is None:
+        response = table.upsert(row, on_conflict="user_id", ignore_duplicates=True).execute()
+    else:
+        response = table.update(row).eq("user_id", user_id).eq("updated_at", expected_updated_at).execute()
+    return bool(response.data)
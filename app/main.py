@@ -1,7 +1,23 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from app.config import WARMUP_ON_STARTUP
 from app.routes import auth, chat, finance # user, finance
 from fastapi.middleware.cors import CORSMiddleware
-app = FastAPI(title="WealthWise Backend", version="1.0.0")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients and parsers are lazy by default; opt into paying for them at boot instead
+    if WARMUP_ON_STARTUP:
+        from app.startup import warm_up
+        await run_in_threadpool(warm_up)
+    yield
+    from app.startup import shut_down
+    shut_down()
+
+
+app = FastAPI(title="WealthWise Backend", version="1.0.0", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # ⚠️ for dev, later restrict to your frontend domain
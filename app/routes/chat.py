@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, Body
 from fastapi.security import HTTPBearer
 from app.utils.auth import verify_jwt
 from app.aimodels.openai_service import get_chat_response_openai
+from app.aimodels.query_cache import chat_answer_cache
 import logging
 from pydantic import BaseModel
 
@@ -34,4 +35,10 @@ async def chat_with_bot(payload: ChatQuery, token: str = Depends(security)):
 
     except Exception as e:
         logger.error(f"Chatbot error for user {user_id}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="AI service unavailable. Please try again later.")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="AI service unavailable. Please try again later.")
+
+
+@router.get("/cache-stats")
+async def chat_cache_stats(token: str = Depends(security)):
+    verify_jwt(token.credentials)
+    return chat_answer_cache.metrics()
@@ -1,13 +1,19 @@
-from fastapi import APIRouter, Depends, File, Form, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+import asyncio
+import base64
+import json
+import uuid
+from datetime import date
+from fastapi import APIRouter, Depends, File, Form, Query, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from typing import List, Literal, Optional
 from app.utils.advice_generator import generate_investment_advice
 from app.utils.auth import verify_jwt
-from app.utils.transactions.read_pdf import extract_transactions_from_uploaded_bytes
-from app.config import supabase
+from app.utils.responses import FastJSONResponse
+from app.config import get_supabase
+from app.database import get_spending_stats, get_transactions, iter_transactions, query_transactions, save_spending_stats
 router = APIRouter()
 security = HTTPBearer()
 
@@ -22,33 +28,69 @@ class AdviceRequest(BaseModel):
 #     return {"summary": {"transactions": txns, "cashflow": "🚧 To be calculated"}}
 
 
+def to_db_rows(transactions: List[dict]) -> List[dict]:
+    rows = []
+    for txn in transactions:
+        rows.append({
+            "txn_date": txn['date'],
+            "description": txn["description"],
+            "debit": txn["debit"],
+            "credit": txn["credit"],
+            "amount": txn["amount"],
+            "balance": txn["balance"],
+            "user_id": txn["user_id"],
+            "category": txn["categories"],
+            "anomaly": txn["anomaly"],
+        })
+    return rows
+
+
+def store_spending_stats(user_id: str, transactions: List[dict], stats: dict, version, attempts: int = 3) -> bool:
+    """
+    Saves the user's updated anomaly stats, guarded by their updated_at. If another
+    upload for the same user saved first, this upload's transactions are folded
+    into the newer stats and the save is retried, so neither update is lost.
+    Anomalies already assigned to this upload were scored against the older stats.
+    """
+    from app.utils.transactions.anomalies import fold_transactions
+    for _ in range(attempts):
+        if save_spending_stats(user_id, stats, version):
+            return True
+        latest, version = get_spending_stats(user_id)
+        stats = fold_transactions(transactions, latest)
+    print(f"Could not save spending stats for {user_id}: concurrent updates kept winning")
+    return False
+
+
 @router.post("/extract-transactions")
-async def parse_transactions(token: str = Depends(security), pdf: UploadFile = File(...), password: Optional[str] = Form(None),):
+async def parse_transactions(token: str = Depends(security), pdf: UploadFile = File(...), password: Optional[str] = Form(None),
+                             compact: bool = Query(False, description="omit fields that repeat the description")):
     user = verify_jwt(token.credentials)
     if user:
         try:
+            # Imported here so pandas/pdfplumber only load when a statement is first parsed
+            from app.utils.transactions.read_pdf import extract_transactions_from_uploaded_bytes
+            from app.utils.transactions.anomalies import score_transactions
             pdf_bytes = await pdf.read()
             # Use your helper function
             transactions = extract_transactions_from_uploaded_bytes(pdf_bytes, password=password, user_id=user['sub'])
 
+            # Score each transaction against the user's running spending stats
+            stats, stats_version = get_spending_stats(user['sub'])
+            transactions, spending_stats = score_transactions(transactions, stats)
+
             # now insert the transactions into the database
-            rows = []
-            for txn in transactions:
-                rows.append({
-                    "txn_date": txn['date'],
-                    "description": txn["description"],
-                    "debit": txn["debit"],
-                    "credit": txn["credit"],
-                    "amount": txn["amount"],
-                    "balance": txn["balance"],
-                    "user_id": txn["user_id"],
-                    "category": txn["categories"],
-                })
-
-            response = supabase.table("transactions").insert(rows).execute()
+            rows = to_db_rows(transactions)
+
+            response = get_supabase().table("transactions").insert(rows).execute()
             print(response)
+            store_spending_stats(user['sub'], transactions, spending_stats, stats_version)
 
-            return JSONResponse(content=jsonable_encoder({"transactions": transactions}))
+            anomaly_count = sum(1 for txn in transactions if txn["anomaly"])
+            if compact:
+                from app.utils.transactions.categories import compact_transactions
+                transactions = compact_transactions(transactions)
+            return FastJSONResponse({"transactions": transactions, "anomaly_count": anomaly_count})
         except ValueError as ve:
             # For invalid password or custom errors raised by helper
             raise HTTPException(status_code=400, detail=str(ve))
@@ -57,6 +99,252 @@ async def parse_transactions(token: str = Depends(security), pdf: UploadFile = F
 
 
 
+async def parse_statements_in_pool(statements: List[tuple], password: Optional[str]) -> list:
+    """
+    Parses (name, bytes) statements in the worker pool; returns a frame or an
+    exception per statement. If a worker dies (a crash on a malformed PDF, an OOM
+    kill) the pool is broken for good, so it is replaced and the affected
+    statements are retried once before being reported as failed.
+    """
+    from concurrent.futures.process import BrokenProcessPool
+    from app.utils.transactions.read_pdf import extract_statement_frame, get_parse_executor, reset_parse_executor
+
+    async def run(batch):
+        loop = asyncio.get_running_loop()
+        try:
+            pool = get_parse_executor()
+            # The pool size bounds how many statements are parsed at the same time
+            futures = [loop.run_in_executor(pool, extract_statement_frame, data, password) for _, data in batch]
+        except BrokenProcessPool as e:
+            return [e] * len(batch)
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    results = await run(statements)
+    broken = [i for i, r in enumerate(results) if isinstance(r, BrokenProcessPool)]
+    if broken:
+        print(f"Statement parsing pool broke; retrying {len(broken)} statement(s) on a fresh pool")
+        reset_parse_executor()
+        retried = await run([statements[i] for i in broken])
+        for i, result in zip(broken, retried):
+            results[i] = ValueError("Statement could not be parsed (parser process crashed)") \
+                if isinstance(result, BrokenProcessPool) else result
+        if any(isinstance(r, BrokenProcessPool) for r in retried):
+            reset_parse_executor()
+    return results
+
+
+async def read_batch_statements(files: List[UploadFile]) -> List[tuple]:
+    """
+    (name, bytes) for each statement in the upload, unzipping zip files. The
+    statement count and total size are checked while reading, so an oversized
+    upload is refused before all of it is read or decompressed.
+    """
+    from app.utils.transactions.read_pdf import BATCH_MAX_FILES, BATCH_MAX_UNZIPPED_BYTES, pdfs_from_zip
+    statements, total = [], 0
+    for upload in files:
+        if len(statements) >= BATCH_MAX_FILES:
+            raise ValueError(f"At most {BATCH_MAX_FILES} statements can be uploaded at once")
+        remaining = BATCH_MAX_UNZIPPED_BYTES - total
+        data = await upload.read(remaining + 1)
+        if len(data) > remaining:
+            raise ValueError(f"Statements can be at most {BATCH_MAX_UNZIPPED_BYTES // (1024 * 1024)} MB in total")
+        name = upload.filename or "statement.pdf"
+        if name.lower().endswith(".zip") or upload.content_type in ("application/zip", "application/x-zip-compressed"):
+            pdfs = await run_in_threadpool(pdfs_from_zip, data, BATCH_MAX_FILES - len(statements), remaining)
+        else:
+            pdfs = [(name, data)]
+        statements.extend(pdfs)
+        total += sum(len(pdf) for _, pdf in pdfs)
+    return statements
+
+
+def store_batch(user_id: str, frames: list) -> List[dict]:
+    """Merges parsed statements, scores and inserts them, and saves the user's stats. Blocking."""
+    from app.utils.transactions.read_pdf import merge_statement_frames
+    from app.utils.transactions.anomalies import score_transactions
+    transactions = merge_statement_frames(frames, user_id)
+    stats, stats_version = get_spending_stats(user_id)
+    transactions, spending_stats = score_transactions(transactions, stats)
+
+    if transactions:
+        get_supabase().table("transactions").insert(to_db_rows(transactions)).execute()
+    store_spending_stats(user_id, transactions, spending_stats, stats_version)
+    return transactions
+
+
+@router.post("/extract-transactions/batch")
+async def parse_transactions_batch(token: str = Depends(security), files: List[UploadFile] = File(...), password: Optional[str] = Form(None),
+                                   compact: bool = Query(False, description="omit fields that repeat the description")):
+    """
+    Parses several statements (PDFs, or a single zip of PDFs) in parallel, drops
+    rows repeated across overlapping statement periods and stores the merged,
+    date-sorted result in one bulk insert.
+    """
+    user = verify_jwt(token.credentials)
+    if user:
+        try:
+            statements = await read_batch_statements(files)
+            if not statements:
+                raise ValueError("No PDF statements found in the upload")
+
+            results = await parse_statements_in_pool(statements, password)
+
+            frames, report = [], []
+            for (name, _), result in zip(statements, results):
+                if isinstance(result, Exception):
+                    report.append({"filename": name, "rows": 0, "error": str(result)})
+                else:
+                    frames.append(result)
+                    report.append({"filename": name, "rows": len(result), "error": None})
+            if not frames:
+                raise ValueError("None of the statements could be parsed")
+
+            # pandas merging and the database round trips would otherwise stall the event loop
+            transactions = await run_in_threadpool(store_batch, user['sub'], frames)
+
+            parsed_rows = sum(r["rows"] for r in report)
+            anomaly_count = sum(1 for txn in transactions if txn["anomaly"])
+            if compact:
+                from app.utils.transactions.categories import compact_transactions
+                transactions = compact_transactions(transactions)
+            return FastJSONResponse({
+                "statements": report,
+                "duplicates_removed": parsed_rows - len(transactions),
+                "anomaly_count": anomaly_count,
+                "transactions": transactions,
+            })
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["txn_date"], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """
+    (txn_date, id) from a cursor. Both end up inside a PostgREST filter, so they
+    are checked and re-serialized: an ISO date and an integer or UUID id.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        txn_date, txn_id = json.loads(base64.urlsafe_b64decode(padded))
+        txn_date = date.fromisoformat(txn_date).isoformat()
+        if isinstance(txn_id, bool) or not isinstance(txn_id, (int, str)):
+            raise ValueError("bad id")
+        txn_id = txn_id if isinstance(txn_id, int) else str(uuid.UUID(txn_id))
+        return txn_date, txn_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/transactions")
+def list_transactions(
+    token: str = Depends(security),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    direction: Optional[Literal["debit", "credit"]] = None,
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+):
+    """
+    Pages through the user's transactions in (txn_date, id) order. Filters are
+    applied in the database; pass `next_cursor` back as `cursor` for the next page.
+    """
+    user = verify_jwt(token.credentials)
+    user_id = user.get('sub')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    after = decode_cursor(cursor) if cursor else None
+    try:
+        # One extra row tells us whether another page exists
+        rows = query_transactions(
+            user_id,
+            limit=limit + 1,
+            after=after,
+            start_date=start_date.isoformat() if start_date else None,
+            end_date=end_date.isoformat() if end_date else None,
+            category=category,
+            direction=direction,
+            min_amount=min_amount,
+            max_amount=max_amount,
+        )
+    except Exception as e:
+        print(f"An unexpected error occurred in transactions endpoint: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected internal error occurred.")
+
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return FastJSONResponse({"transactions": page, "count": len(page), "next_cursor": next_cursor})
+
+
+@router.get("/transactions/export")
+def export_transactions(
+    token: str = Depends(security),
+    format: Literal["csv", "parquet", "arrow"] = "csv",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    category: Optional[str] = None,
+    direction: Optional[Literal["debit", "credit"]] = None,
+):
+    """
+    Streams the user's full (optionally filtered) history as CSV, Parquet or an
+    Arrow IPC stream with a flat, typed schema. Rows are fetched and encoded one
+    page at a time, so memory stays constant however long the history is.
+    """
+    user = verify_jwt(token.credentials)
+    user_id = user.get('sub')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+
+    from app.utils.transactions.export import EXPORT_DB_COLUMNS, EXPORT_FORMATS, export_chunks
+    if format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"{format} export requires pyarrow to be installed")
+
+    pages = iter_transactions(
+        user_id,
+        columns=EXPORT_DB_COLUMNS,
+        start_date=start_date.isoformat() if start_date else None,
+        end_date=end_date.isoformat() if end_date else None,
+        category=category,
+        direction=direction,
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_chunks(pages, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="transactions.{extension}"'},
+    )
+
+
+@router.get("/recurring")
+def get_recurring_payments(token: str = Depends(security)):
+    """
+    Detects recurring debits (SIPs, EMIs, rent, subscriptions) in the user's
+    transaction history.
+    """
+    user = verify_jwt(token.credentials)
+    user_id = user.get('sub')
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    try:
+        from app.utils.transactions.recurring import detect_recurring_payments, summarize_recurring
+        history = get_transactions(user_id, columns="id,txn_date,description,debit,amount,category")
+        recurring = detect_recurring_payments(history)
+        return {"recurring": recurring, "summary": summarize_recurring(recurring)}
+    except Exception as e:
+        print(f"An unexpected error occurred in recurring endpoint: {e}")
+        raise HTTPException(status_code=500, detail="An unexpected internal error occurred.")
+
+
 @router.post("/generate-advice", response_model=dict)
 async def get_investment_advice(request: AdviceRequest, token: str = Depends(security)):
     """
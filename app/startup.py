@@ -0,0 +1,49 @@
+# startup.py
+import importlib
+import logging
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Modules that pull in pandas / numpy / pdfplumber / PyMuPDF. Routes import them on
+# first use; warming up imports them before the first request instead.
+HEAVY_MODULES = [
+    "app.utils.transactions.read_pdf",
+    "app.utils.transactions.layouts",
+]
+
+
+def warm_up() -> dict:
+    """
+    Imports the heavy parsers, builds the API clients and fetches the market digest
+    ahead of the first request.
+    Every step is optional: a missing credential is logged and skipped, not fatal.
+    Returns the time taken per step in milliseconds.
+    """
+    from app.config import get_supabase
+    from app.aimodels.openai_service import get_client
+    from app.utils.advice_generator import fetch_market_data
+    from app.utils.prompt_builder import market_digest_cache
+
+    timings = {}
+    steps = [(name, lambda name=name: importlib.import_module(name)) for name in HEAVY_MODULES]
+    steps += [("supabase_client", get_supabase), ("openai_client", get_client),
+              ("market_digest", lambda: market_digest_cache.get(fetch_market_data))]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.warning(f"Warm-up step {name} skipped: {e}")
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info(f"Warm-up finished: {timings}")
+    return timings
+
+
+def shut_down() -> None:
+    """Releases resources created lazily while serving (e.g. the statement parsing pool)."""
+    read_pdf = sys.modules.get("app.utils.transactions.read_pdf")
+    if read_pdf:
+        read_pdf.reset_parse_executor()
@@ -1,9 +1,10 @@
 import requests
 import json
 import os
-from app.config import supabase
+from fastapi.concurrency import run_in_threadpool
+from app.database import get_transactions
 from app.aimodels.openai_service import generate_structured_response_openai
-from openai import APIStatusError
+from app.utils.prompt_builder import build_advice_prompt, digest_metadata, market_digest_cache
 
 # --- Helper Functions ---
 
@@ -31,7 +32,8 @@ def fetch_market_data() -> dict:
     api_key = os.getenv("INDIAN_STOCK_API_KEY")
     if not api_key:
         return {"error": "API key is not configured."}
-    base_url = "https://stock.indianapi.in"
+    base_url = os.getenv("INDIAN_STOCK_API_URL", "https://stock.indianapi.in")
+    timeout = float(os.getenv("MARKET_DATA_TIMEOUT_SECONDS", 10))
     headers = {'X-Api-Key': api_key}
 
     def process_stock_data(stock_list: list) -> list:
@@ -60,10 +62,10 @@ def fetch_market_data() -> dict:
 
     try:
         # Make all API calls, including the new /news endpoint
-        bse_res = requests.get(f"{base_url}/BSE_most_active", headers=headers)
-        nse_res = requests.get(f"{base_url}/NSE_most_active", headers=headers)
-        mf_res = requests.get(f"{base_url}/mutual_funds", headers=headers)
-        news_res = requests.get(f"{base_url}/news", headers=headers)
+        bse_res = requests.get(f"{base_url}/BSE_most_active", headers=headers, timeout=timeout)
+        nse_res = requests.get(f"{base_url}/NSE_most_active", headers=headers, timeout=timeout)
+        mf_res = requests.get(f"{base_url}/mutual_funds", headers=headers, timeout=timeout)
+        news_res = requests.get(f"{base_url}/news", headers=headers, timeout=timeout)
 
         # Check for errors
         for res in [bse_res, nse_res, mf_res, news_res]:
@@ -98,52 +100,31 @@ def fetch_market_data() -> dict:
 
 # --- Main Orchestration Function (Enhanced) ---
 async def generate_investment_advice(user_id: str, risk_profile: str, investment_goal: str, investment_horizon: str) -> dict:
-    response = supabase.table("transactions").select("*").eq("user_id", user_id).execute()
-    financial_summary = analyze_transactions(response.data)
-    market_data = fetch_market_data()
-
-    if "error" in market_data:
-         return {"error": f"Failed to fetch market data: {market_data['error']}"}
-
-    # The new prompt now includes a section for news analysis
-    prompt = f"""
-    You are an expert financial advisor for the Indian market named WealthWise. Your goal is to provide a practical, personalized, and actionable investment plan. Generate a response in valid JSON.
-
-    **USER CONTEXT:**
-    - Risk Tolerance: "{risk_profile}"
-    - Stated Investment Goal: "{investment_goal}"
-    - Investment Horizon: "{investment_horizon}"
-    - Estimated Net Monthly Savings: {financial_summary['net_monthly_savings']} INR
-
-    **MARKET CONTEXT:**
-    - Today's Most Active Stocks (NSE): {json.dumps(market_data['nse_most_active'])}
-    - Top Performing Mutual Funds: {json.dumps(market_data['popular_mutual_funds'])}
-    - Recent Financial News: {json.dumps(market_data['latest_news'])}
-
-    **YOUR TASK:**
-    Based on all the above information, generate a practical investment plan.
-    1. **First, analyze the 'Recent Financial News' to determine the overall market sentiment. Synthesize this into a very short, one-sentence insight.**
-    2. Suggest a mix of 1-2 stocks AND 1-2 mutual funds that align with the user's profile and the market sentiment.
-    3. Calculate and recommend a monthly SIP amount based on their net monthly savings.
-    4. For each suggestion, provide a brief 'reasoning'.
-    5. Provide a 'summary' of the strategy and a 'disclaimer'.
-
-    **OUTPUT FORMAT (must be valid JSON):**
-    {{
-      "market_insight": "A very short, one-sentence summary of the current market sentiment based on the news.",
-      "summary": "A brief overview of the investment strategy...",
-      "recommended_monthly_sip": "A calculated SIP amount in INR...",
-      "recommendations": [
-        {{
-          "instrument_name": "Name of Stock/Fund",
-          "type": "Stock or Mutual Fund",
-          "reasoning": "Why this is recommended for their specific goal and horizon...",
-          "risk_level_match": "Explains how it matches their risk profile."
-        }}
-      ],
-      "disclaimer": "This is AI-generated advice for informational purposes only..."
-    }}
-    """
+    # Imported here to keep pandas off the app's import path
+    from app.utils.transactions.recurring import detect_recurring_payments, summarize_recurring
+
+    # Loaded page by page, only the columns the summaries need. Both steps block,
+    # so they run in the threadpool instead of stalling the event loop.
+    transactions = await run_in_threadpool(
+        get_transactions, user_id, columns="id,txn_date,description,debit,credit,amount,category",
+    )
+    financial_summary = analyze_transactions(transactions)
+    recurring = await run_in_threadpool(detect_recurring_payments, transactions)
+    financial_summary["recurring_commitments"] = summarize_recurring(recurring)
+    existing_recurring = [
+        {"payee": r["counterparty"], "kind": r["kind"], "frequency": r["frequency"], "amount": r["typical_amount"]}
+        for r in recurring if r["active"]
+    ][:8]
+    try:
+        # Market data is condensed into a cached digest; only a refresh hits the API
+        digest = await run_in_threadpool(market_digest_cache.get, fetch_market_data)
+    except ValueError as e:
+        return {"error": f"Failed to fetch market data: {e}"}
+
+    prompt, prompt_report = build_advice_prompt(
+        digest, risk_profile, investment_goal, investment_horizon, financial_summary, existing_recurring,
+    )
+    print(f"Advice prompt: {prompt_report['prompt_tokens']} tokens (budget {prompt_report['token_budget']}, trimmed {prompt_report['trimmed_items']})")
 
     ai_advice_json = {}
     try:
@@ -152,14 +133,13 @@ async def generate_investment_advice(user_id: str, risk_profile: str, investment
     except Exception as e:
         ai_advice_json = {"error": "An unexpected error occurred during AI advice generation.", "details": str(e)}
 
-    # We no longer need to pass the full market data to the frontend if the AI is summarizing it
-    # But for now, we'll keep it for debugging purposes.
     return {
         "user_id": user_id,
         "risk_profile": risk_profile,
         "investment_goal": investment_goal,
         "investment_horizon": investment_horizon,
         "financial_summary": financial_summary,
-        "market_data_used": market_data, # Renamed for clarity
+        "market_digest": digest_metadata(digest),
+        "prompt": prompt_report,
         "ai_advice": ai_advice_json
     }
\ No newline at end of file
@@ -0,0 +1,238 @@
+# prompt_builder.py
+"""
+Builds the investment-advice prompt from a precomputed market digest.
+
+The market data is turned into short text lines once per refresh and cached
+for MARKET_DIGEST_TTL_SECONDS, so advice calls only fill a template. The
+rendered prompt is measured in tokens (tiktoken when installed, otherwise a
+chars/4 estimate) and trimmed to ADVICE_PROMPT_TOKEN_BUDGET by dropping items
+from the least useful sections first.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# --- Configuration ---
+ADVICE_PROMPT_TOKEN_BUDGET = int(os.getenv("ADVICE_PROMPT_TOKEN_BUDGET", 1200))
+MARKET_DIGEST_TTL_SECONDS = int(os.getenv("MARKET_DIGEST_TTL_SECONDS", 15 * 60))
+MARKET_DIGEST_RETRY_SECONDS = int(os.getenv("MARKET_DIGEST_RETRY_SECONDS", 60))
+TOKENIZER_MODEL = os.getenv("ADVICE_TOKENIZER_MODEL", "gpt-4o")
+NEWS_SUMMARY_CHARS = 220
+
+# Trimmable sections, least valuable first: items are dropped from the end of
+# the first non-empty section until the prompt fits the budget.
+TRIM_ORDER = ["news", "recurring", "nse_stocks", "funds"]
+
+PROMPT_TEMPLATE = """You are WealthWise, an expert financial advisor for the Indian market. Give a practical, personalized, actionable investment plan as valid JSON.
+
+USER:
+- Risk tolerance: {risk_profile}
+- Goal: {investment_goal}
+- Horizon: {investment_horizon}
+- Net monthly savings: {net_monthly_savings} INR
+- Recurring monthly commitments (already in savings): {monthly_committed} INR
+- Existing recurring payments (payee | kind | frequency | INR):
+{recurring}
+
+MARKET ({market_as_of}):
+- Most active NSE stocks (company | price | % change | rating):
+{nse_stocks}
+- Top mutual funds by 1y return (fund | 1y % | 3y %):
+{funds}
+- Recent news:
+{news}
+
+TASK:
+1. From the news, state the market sentiment in one short sentence.
+2. Suggest 1-2 stocks and 1-2 mutual funds matching the user's profile and the sentiment.
+3. Recommend a monthly SIP amount from the net monthly savings, accounting for SIPs already running.
+4. Give a brief reasoning for each suggestion.
+5. Add a strategy summary and a disclaimer.
+
+Reply with JSON only:
+{{"market_insight": "one sentence", "summary": "strategy overview", "recommended_monthly_sip": "amount in INR", "recommendations": [{{"instrument_name": "", "type": "Stock or Mutual Fund", "reasoning": "", "risk_level_match": ""}}], "disclaimer": ""}}"""
+
+
+# --- Token counting ---
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(TOKENIZER_MODEL)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    if encoder is None:
+        # ~4 characters per token for English text
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text))
+
+
+def token_counter() -> str:
+    return "tiktoken" if _encoder() is not None else "estimate"
+
+
+# --- Market digest ---
+def _fmt(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def _truncate(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def build_market_digest(market_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact text lines for each market section, computed once per refresh."""
+    def stocks(rows):
+        return [f"{s.get('company')} | {_fmt(s.get('price'))} | {_fmt(s.get('percent_change'))} | {_fmt(s.get('overall_rating'))}"
+                for s in rows or []]
+
+    sections = {
+        "nse_stocks": stocks(market_data.get("nse_most_active")),
+        "funds": [f"{f.get('fund_name')} | {_fmt(f.get('1_year_return'))} | {_fmt(f.get('3_year_return'))}"
+                  for f in market_data.get("popular_mutual_funds") or []],
+        "news": [f"{_truncate(n.get('title'), 120)}: {_truncate(n.get('summary'), NEWS_SUMMARY_CHARS)}"
+                 for n in market_data.get("latest_news") or []],
+    }
+    fetched_at = time.time()
+    return {
+        "sections": sections,
+        "fetched_at": fetched_at,
+        "as_of": time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime(fetched_at)),
+        "tokens": count_tokens("\n".join(line for lines in sections.values() for line in lines)),
+    }
+
+
+class MarketDigestCache:
+    """Holds the latest digest; refreshes it at most once per TTL across concurrent requests."""
+
+    def __init__(self, ttl_seconds: int = MARKET_DIGEST_TTL_SECONDS, retry_seconds: int = MARKET_DIGEST_RETRY_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.retry_seconds = retry_seconds
+        self._digest: Optional[Dict[str, Any]] = None
+        # After a failed refresh: don't call upstream again before this time
+        self._retry_at = 0.0
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _cached(self) -> Optional[Dict[str, Any]]:
+        digest, now = self._digest, time.time()
+        if digest and now - digest["fetched_at"] < self.ttl_seconds:
+            return digest
+        if now < self._retry_at:
+            # Upstream failed recently: answer from what we have without waiting on it
+            if digest:
+                return {**digest, "stale": True}
+            raise ValueError(self._last_error)
+        return None
+
+    def get(self, fetch: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns a fresh digest, calling `fetch` (fetch_market_data) when the cached
+        one has expired. A failed refresh serves the previous digest marked stale,
+        or raises ValueError with nothing cached, and upstream isn't retried for
+        retry_seconds so an outage doesn't make every request wait on it.
+        """
+        cached = self._cached()
+        if cached:
+            return cached
+        with self._lock:
+            cached = self._cached()
+            if cached:
+                return cached
+            market_data = fetch()
+            if "error" not in market_data:
+                self._digest = build_market_digest(market_data)
+                self._retry_at, self._last_error = 0.0, None
+                return self._digest
+            print(f"Market data refresh failed: {market_data['error']}")
+            self._retry_at = time.time() + self.retry_seconds
+            self._last_error = market_data["error"]
+            if self._digest:
+                return {**self._digest, "stale": True}
+            raise ValueError(market_data["error"])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._digest = None
+            self._retry_at, self._last_error = 0.0, None
+
+
+# Shared instance used by the advice generator
+market_digest_cache = MarketDigestCache()
+
+
+def digest_metadata(digest: Dict[str, Any]) -> Dict[str, Any]:
+    """What the client gets back instead of the raw market data."""
+    return {
+        "as_of": digest["as_of"],
+        "age_seconds": round(time.time() - digest["fetched_at"]),
+        "stale": digest.get("stale", False),
+        "items": {name: len(lines) for name, lines in digest["sections"].items()},
+    }
+
+
+# --- Prompt ---
+def _lines(items: List[str]) -> str:
+    return "\n".join(f"  - {item}" for item in items) if items else "  - none"
+
+
+def build_advice_prompt(
+    digest: Dict[str, Any],
+    risk_profile: str,
+    investment_goal: str,
+    investment_horizon: str,
+    financial_summary: Dict[str, Any],
+    recurring: List[Dict[str, Any]],
+    budget: int = ADVICE_PROMPT_TOKEN_BUDGET,
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Renders the advice prompt and trims it to `budget` tokens.
+    Returns the prompt and a report: token count, budget and what was dropped.
+    """
+    sections = {name: list(lines) for name, lines in digest["sections"].items()}
+    sections["recurring"] = [f"{r['payee']} | {r['kind']} | {r['frequency']} | {_fmt(r['amount'])}" for r in recurring]
+    fixed = {
+        "risk_profile": risk_profile,
+        "investment_goal": investment_goal,
+        "investment_horizon": investment_horizon,
+        "net_monthly_savings": _fmt(financial_summary.get("net_monthly_savings")),
+        "monthly_committed": _fmt((financial_summary.get("recurring_commitments") or {}).get("monthly_committed", 0)),
+        "market_as_of": digest["as_of"],
+    }
+
+    def render() -> str:
+        return PROMPT_TEMPLATE.format(**fixed, **{name: _lines(lines) for name, lines in sections.items()})
+
+    prompt = render()
+    tokens = count_tokens(prompt)
+    trimmed: Dict[str, int] = {}
+    for name in TRIM_ORDER:
+        while tokens > budget and sections[name]:
+            sections[name].pop()
+            trimmed[name] = trimmed.get(name, 0) + 1
+            prompt = render()
+            tokens = count_tokens(prompt)
+        if tokens <= budget:
+            break
+
+    return prompt, {
+        "prompt_tokens": tokens,
+        "token_budget": budget,
+        "over_budget": tokens > budget,
+        "trimmed_items": trimmed,
+        "token_counter": token_counter(),
+    }
@@ -0,0 +1,40 @@
+import json
+import math
+from typing import Any
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _finite(obj: Any) -> Any:
+    """NaN/inf -> None, recursively. Only needed on the stdlib json fallback."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def _default(obj: Any) -> Any:
+    # Anything orjson doesn't know natively (pandas Timestamp, Decimal, models, ...)
+    return jsonable_encoder(obj)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded in one pass with orjson instead of walking the payload
+    through jsonable_encoder first. NaN and infinity are written as null, numpy
+    scalars/arrays are supported. Falls back to the stdlib encoder without orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(_finite(jsonable_encoder(content)), ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
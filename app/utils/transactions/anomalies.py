@@ -0,0 +1,142 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from app.utils.transactions.recurring import payee_key
+
+# ---------------- Configuration ----------------
+STATS_VERSION = 1
+MIN_CATEGORY_HISTORY = 5        # debits seen in a category before its z-score is trusted
+MIN_PAYEE_HISTORY = 20          # debits seen overall before a new payee is considered unusual
+Z_THRESHOLD = 3.0
+NEW_PAYEE_MULTIPLIER = 2.0      # new payee is unusual when paid this many times the user's mean debit
+BALANCE_DROP_RATIO = 0.5        # a single debit taking out half the balance or more
+MIN_ANOMALY_AMOUNT = 500.0      # never flag small debits
+MAX_TRACKED_PAYEES = 5000
+
+
+# ---------------- Running statistics ----------------
+def new_stats() -> Dict[str, Any]:
+    """Empty per-user state. Plain dicts so it can be stored as JSON as-is."""
+    return {
+        "version": STATS_VERSION,
+        "overall": {"n": 0, "mean": 0.0, "m2": 0.0},
+        "categories": {},
+        "payees": {},
+    }
+
+
+def _welford_update(acc: Dict[str, float], x: float) -> None:
+    acc["n"] += 1
+    delta = x - acc["mean"]
+    acc["mean"] += delta / acc["n"]
+    acc["m2"] += delta * (x - acc["mean"])
+
+
+def _std(acc: Dict[str, float]) -> float:
+    return math.sqrt(acc["m2"] / (acc["n"] - 1)) if acc["n"] > 1 else 0.0
+
+
+def _outflow(txn: Dict[str, Any]) -> Optional[float]:
+    debit = txn.get("debit")
+    if debit is not None and debit > 0:
+        return float(debit)
+    amount = txn.get("amount")
+    if amount is not None and amount < 0:
+        return float(-amount)
+    return None
+
+
+def _category_key(categories: Dict[str, Any]) -> str:
+    category = categories.get("category") or "Unknown"
+    if category.startswith("Unknown"):
+        # No MCC code: fall back to the payment rail (UPI, Bank Transfer, ...)
+        return categories.get("transaction_type") or "Unknown"
+    return category
+
+
+def _trim_payees(payees: Dict[str, int]) -> None:
+    # Keep the map bounded by forgetting the least frequent payees
+    if len(payees) > MAX_TRACKED_PAYEES:
+        for key, _ in sorted(payees.items(), key=lambda kv: kv[1])[:len(payees) - MAX_TRACKED_PAYEES]:
+            del payees[key]
+
+
+# ---------------- Scoring ----------------
+def score_transaction(txn: Dict[str, Any], stats: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Scores one transaction against the user's running statistics, then folds it in.
+    O(1) per transaction. Returns the anomaly details, or None when nothing is unusual.
+    """
+    categories = txn.get("categories") or {}
+    outflow = _outflow(txn)
+    balance = txn.get("balance")
+    flags: List[str] = []
+    details: Dict[str, Any] = {}
+    score = 0.0
+
+    if outflow is not None:
+        category = _category_key(categories)
+        payee = payee_key(txn.get("description"), categories.get("counterparty"))
+        cat_stats = stats["categories"].setdefault(category, {"n": 0, "mean": 0.0, "m2": 0.0})
+        overall = stats["overall"]
+
+        if outflow >= MIN_ANOMALY_AMOUNT:
+            std = _std(cat_stats)
+            if cat_stats["n"] >= MIN_CATEGORY_HISTORY and std > 0:
+                z = (outflow - cat_stats["mean"]) / std
+                if z >= Z_THRESHOLD:
+                    flags.append("amount_spike")
+                    details.update({"category": category, "z_score": round(z, 2), "category_mean": round(cat_stats["mean"], 2)})
+                    score = max(score, z / Z_THRESHOLD)
+
+            if payee and payee not in stats["payees"] and overall["n"] >= MIN_PAYEE_HISTORY \
+                    and outflow >= NEW_PAYEE_MULTIPLIER * overall["mean"]:
+                flags.append("new_payee")
+                details.update({"payee": payee, "typical_debit": round(overall["mean"], 2)})
+                score = max(score, outflow / (NEW_PAYEE_MULTIPLIER * overall["mean"]))
+
+        # Measured against the row's own opening balance: rows aren't guaranteed to
+        # arrive in statement order, and earlier uploads may cover a later period
+        opening = balance + outflow if balance is not None else None
+        if opening is not None and opening > 0 and outflow >= MIN_ANOMALY_AMOUNT:
+            drop = outflow / opening
+            if drop >= BALANCE_DROP_RATIO or balance < 0:
+                flags.append("balance_drop")
+                details.update({"previous_balance": round(opening, 2), "balance_drop_pct": round(drop * 100, 1)})
+                score = max(score, drop / BALANCE_DROP_RATIO)
+
+        _welford_update(cat_stats, outflow)
+        _welford_update(overall, outflow)
+        if payee:
+            stats["payees"][payee] = stats["payees"].get(payee, 0) + 1
+
+    if not flags:
+        return None
+    return {"score": round(score, 2), "flags": flags, **details}
+
+
+def score_transactions(transactions: List[Dict[str, Any]], stats: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Adds an 'anomaly' field to each enriched transaction and
+    returns the transactions with the updated statistics to persist for the user.
+    """
+    if not stats or stats.get("version") != STATS_VERSION:
+        stats = new_stats()
+    stats.pop("last_balance", None)  # no longer tracked; dropped from stats saved before
+    for txn in transactions:
+        txn["anomaly"] = score_transaction(txn, stats)
+    _trim_payees(stats["payees"])
+    return transactions, stats
+
+
+def fold_transactions(transactions: List[Dict[str, Any]], stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Updates the statistics with already-scored transactions without touching their
+    'anomaly' field. Used to merge an upload into stats another upload saved first.
+    """
+    if not stats or stats.get("version") != STATS_VERSION:
+        stats = new_stats()
+    stats.pop("last_balance", None)  # no longer tracked; dropped from stats saved before
+    for txn in transactions:
+        score_transaction(txn, stats)
+    _trim_payees(stats["payees"])
+    return stats
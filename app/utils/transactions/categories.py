@@ -123,3 +123,21 @@ def enrich_transactions(df: pd.DataFrame) -> list[dict]:
         enriched.append(clean_rec)
 
     return enriched
+
+
+def compact_transactions(transactions: list[dict]) -> list[dict]:
+    """
+    Smaller response view of enriched transactions. Drops fields that only repeat
+    what the row already says: categories.raw (the description again), word-list
+    counterparties (description words) and the caller's own user_id.
+    The stored rows are not modified.
+    """
+    compact = []
+    for txn in transactions:
+        row = {k: v for k, v in txn.items() if k != "user_id"}
+        categories = txn.get("categories")
+        if categories:
+            row["categories"] = {k: v for k, v in categories.items()
+                                 if k != "raw" and not (k == "counterparty" and isinstance(v, list))}
+        compact.append(row)
+    return compact
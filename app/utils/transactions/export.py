@@ -0,0 +1,119 @@
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator, List
+import pandas as pd
+
+# ---------------- Configuration ----------------
+# Flat export schema: nested category JSON is spread into plain columns and
+# anomaly details reduced to a score, so each row has a fixed, typed shape.
+EXPORT_COLUMNS = [
+    "id", "txn_date", "description", "debit", "credit", "amount", "balance",
+    "category", "transaction_type", "direction", "counterparty", "transaction_id", "anomaly_score",
+]
+FLOAT_COLUMNS = ["debit", "credit", "amount", "balance", "anomaly_score"]
+CATEGORY_FIELDS = ["category", "transaction_type", "direction", "counterparty", "transaction_id"]
+
+# Columns read from the database for an export
+EXPORT_DB_COLUMNS = "id,txn_date,description,debit,credit,amount,balance,category,anomaly"
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+# ---------------- Helpers ----------------
+def flatten_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    categories = row.get("category") or {}
+    anomaly = row.get("anomaly") or {}
+    flat = {
+        "id": row.get("id"),
+        "txn_date": row.get("txn_date"),
+        "description": row.get("description"),
+        "debit": row.get("debit"),
+        "credit": row.get("credit"),
+        "amount": row.get("amount"),
+        "balance": row.get("balance"),
+        "anomaly_score": anomaly.get("score"),
+    }
+    for field in CATEGORY_FIELDS:
+        value = categories.get(field)
+        # Word-list counterparties (no UPI handle) are joined back into one string
+        flat[field] = " ".join(value) if isinstance(value, list) else value
+    return flat
+
+
+def to_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Flattened, typed DataFrame for one page of database rows."""
+    df = pd.DataFrame([flatten_row(r) for r in rows], columns=EXPORT_COLUMNS)
+    df["txn_date"] = pd.to_datetime(df["txn_date"], errors="coerce").dt.date
+    for column in FLOAT_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+    return df
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are handed out and cleared after each page."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    types = {"id": pa.string(), "txn_date": pa.date32(), **{c: pa.float64() for c in FLOAT_COLUMNS}}
+    return pa.schema([(c, types.get(c, pa.string())) for c in EXPORT_COLUMNS])
+
+
+# ---------------- Streaming writers ----------------
+def csv_chunks(pages: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    """One CSV chunk per database page; only a single page is held in memory."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+    for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(flatten_row(r) for r in page)
+        yield buffer.getvalue().encode()
+
+
+def arrow_chunks(pages: Iterable[List[Dict[str, Any]]], fmt: str) -> Iterator[bytes]:
+    """
+    Parquet (one row group per page) or Arrow IPC stream (one record batch per
+    page), encoded page by page from the pandas frame. Requires pyarrow.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema()
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd") if fmt == "parquet" else pa.ipc.new_stream(sink, schema)
+    try:
+        for page in pages:
+            # id is a uuid or bigint depending on the table; export it as text either way
+            frame = to_frame(page).astype({"id": "string"})
+            writer.write_table(pa.Table.from_pandas(frame, schema=schema, preserve_index=False))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_chunks(pages: Iterable[List[Dict[str, Any]]], fmt: str) -> Iterator[bytes]:
+    if fmt == "csv":
+        return csv_chunks(pages)
+    return arrow_chunks(pages, fmt)
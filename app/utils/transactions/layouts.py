@@ -0,0 +1,437 @@
+# layouts.py
+"""
+Per-bank statement layout templates.
+
+A statement is fingerprinted by its PDF producer and the text of its table
+header line. One fingerprint can have several templates (a bank's layouts
+that share header text but not column positions); the one whose header words
+sit within X_TOLERANCE of the statement's is used. Then rows are read by bucketing words into the stored column
+boundaries, skipping pdfplumber's table detection entirely (words come from
+PyMuPDF when installed, which is much faster still).
+
+Templates are learned from successful generic parses: the header row's cell
+boundaries are taken from pdfplumber's table, and the template is only kept
+if it reproduces the generic result exactly. A statement that doesn't fit its
+template falls back to the generic parser; the template is dropped after
+several misses in a row. Rejected layouts are retried after a back-off.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import pandas as pd
+import pdfplumber
+from app.utils.transactions.read_pdf import build_row, fitz, map_headers, normalize_header, rows_to_frame, to_float
+
+# ---------------- Configuration ----------------
+STATEMENT_LAYOUTS_PATH = os.getenv("STATEMENT_LAYOUTS_PATH")  # optional JSON file to keep templates across restarts
+LAYOUT_MAX_TEMPLATES = int(os.getenv("LAYOUT_MAX_TEMPLATES", 200))
+LAYOUT_MAX_MISSES = int(os.getenv("LAYOUT_MAX_MISSES", 3))  # consecutive misses before a template is dropped
+# Back-off before a rejected layout is learned again; doubles with each rejection
+LAYOUT_REJECT_SECONDS = float(os.getenv("LAYOUT_REJECT_SECONDS", 3600))
+LAYOUT_REJECT_MAX_SECONDS = float(os.getenv("LAYOUT_REJECT_MAX_SECONDS", 7 * 24 * 3600))
+TEMPLATE_VERSION = 3
+LINE_TOLERANCE = 2.0     # words whose tops differ by less than this (pt) are on one line
+X_TOLERANCE = 3.0        # allowed drift (pt) of header words from their learned positions
+MIN_AMOUNT_SHARE = 0.9   # share of template rows that must have an amount
+AMOUNT_FIELDS = ("debit", "credit", "amount", "balance")
+DATE_LIKE = re.compile(r"^(\d{1,2}[/\-. ](\d{1,2}|[A-Za-z]{3,9})[/\-. ]\d{2,4}|\d{4}-\d{2}-\d{2})$")
+
+Word = Tuple[float, float, float, float, str]  # x0, top, x1, bottom, text
+
+
+# ---------------- Words & lines ----------------
+def read_words(pdf_bytes: bytes, max_pages: Optional[int] = None) -> Tuple[str, List[List[Word]]]:
+    """PDF producer and the words of each page. PyMuPDF when available, pdfplumber otherwise."""
+    if fitz is not None:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            meta = doc.metadata or {}
+            producer = meta.get("producer") or meta.get("creator") or ""
+            pages = [[tuple(w[:5]) for w in doc[i].get_text("words")] for i in range(min(len(doc), max_pages or len(doc)))]
+        finally:
+            doc.close()
+        return producer, pages
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        meta = pdf.metadata or {}
+        producer = meta.get("Producer") or meta.get("Creator") or ""
+        pages = [[(w["x0"], w["top"], w["x1"], w["bottom"], w["text"]) for w in page.extract_words()]
+                 for page in pdf.pages[:max_pages]]
+    return str(producer), pages
+
+
+def group_lines(words: List[Word]) -> List[List[Word]]:
+    lines: List[List[Word]] = []
+    for word in sorted(words, key=lambda w: (w[1], w[0])):
+        if lines and abs(word[1] - lines[-1][0][1]) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return [sorted(line, key=lambda w: w[0]) for line in lines]
+
+
+def _is_header(mapping: Dict[str, int]) -> bool:
+    return "date" in mapping and "description" in mapping and any(k in mapping for k in ("amount", "debit", "credit"))
+
+
+def find_header(lines: List[List[Word]]) -> Optional[int]:
+    """Index of the first line whose words look like a transaction table header."""
+    for i, line in enumerate(lines):
+        if _is_header(map_headers([w[4] for w in line])):
+            return i
+    return None
+
+
+def fingerprint(producer: str, header_line: List[Word]) -> str:
+    # Whitespace-free so word-splitting differences between extractors don't matter
+    text = "".join(normalize_header(w[4]) for w in header_line).replace(" ", "")
+    return hashlib.sha1(f"{normalize_header(producer)}|{text}".encode()).hexdigest()[:16]
+
+
+def template_id(fp: str, header_line: List[Word]) -> str:
+    """Store key of a template: its fingerprint plus the header positions it was learned from."""
+    positions = ",".join(f"{w[0]:.1f}" for w in header_line)
+    return f"{fp}-{hashlib.sha1(positions.encode()).hexdigest()[:8]}"
+
+
+# ---------------- Template store ----------------
+def _well_formed(template: Any) -> bool:
+    if not isinstance(template, dict) or template.get("version") != TEMPLATE_VERSION:
+        return False
+    if not isinstance(template.get("id"), str) or not isinstance(template.get("header"), list):
+        return False
+    return bool(template.get("rejected")) or isinstance(template.get("columns"), list)
+
+
+class LayoutStore:
+    """Templates by id, optionally mirrored to a JSON file shared by workers."""
+
+    def __init__(self, path: Optional[str] = STATEMENT_LAYOUTS_PATH, max_templates: int = LAYOUT_MAX_TEMPLATES):
+        self.path = path
+        self.max_templates = max_templates
+        self._templates: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _sync(self) -> None:
+        # Pick up templates learned by other processes
+        if not self.path or not os.path.exists(self.path):
+            return
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            self._templates = {key: t for key, t in data.items() if _well_formed(t)}
+        except (OSError, ValueError) as e:
+            print(f"Could not load statement layouts from {self.path}: {e}")
+        self._mtime = mtime
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._templates, f)
+            os.replace(tmp, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            print(f"Could not save statement layouts to {self.path}: {e}")
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            self._sync()
+            return self._templates.get(key)
+
+    def variants(self, fp: str) -> List[dict]:
+        """All templates (including rejected ones) learned for a fingerprint."""
+        with self._lock:
+            self._sync()
+            return [t for t in self._templates.values() if t.get("fingerprint") == fp]
+
+    def put(self, template: dict) -> None:
+        with self._lock:
+            self._sync()
+            self._templates[template["id"]] = template
+            if len(self._templates) > self.max_templates:
+                # Forget the least used layouts
+                for key, _ in sorted(self._templates.items(), key=lambda kv: kv[1].get("hits", 0))[:len(self._templates) - self.max_templates]:
+                    del self._templates[key]
+            self._save()
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._sync()
+            if self._templates.pop(key, None) is not None:
+                self._save()
+
+    def record_hit(self, key: str) -> None:
+        with self._lock:
+            template = self._templates.get(key)
+            if template:
+                template["hits"] = template.get("hits", 0) + 1
+                template["misses"] = 0
+
+    def record_miss(self, key: str) -> bool:
+        """Counts a statement the template couldn't read; drops it after LAYOUT_MAX_MISSES in a row."""
+        with self._lock:
+            template = self._templates.get(key)
+            if not template:
+                return False
+            template["misses"] = template.get("misses", 0) + 1
+            if template["misses"] < LAYOUT_MAX_MISSES:
+                return False
+            del self._templates[key]
+            self._save()
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._save()
+
+    def summary(self) -> List[dict]:
+        with self._lock:
+            self._sync()
+            return [{"id": key, "fingerprint": t.get("fingerprint"), "producer": t.get("producer"),
+                     "rejected": t.get("rejected", False), "rejected_until": t.get("rejected_until"),
+                     "hits": t.get("hits", 0), "columns": [c["fields"] for c in t.get("columns", [])]}
+                    for key, t in self._templates.items()]
+
+
+# Shared instance used by the statement parser
+layout_store = LayoutStore()
+
+
+# ---------------- Extraction ----------------
+def _header_matches(template: dict, header_line: List[Word]) -> bool:
+    expected = template["header"]
+    return len(expected) == len(header_line) and all(
+        abs(x0 - w[0]) <= X_TOLERANCE for (_, x0), w in zip(expected, header_line))
+
+
+def find_template(fp: str, header_line: List[Word]) -> Optional[dict]:
+    """The template for this fingerprint whose header words sit where the statement's do."""
+    return next((t for t in layout_store.variants(fp) if _header_matches(t, header_line)), None)
+
+
+def _bucket(line: List[Word], columns: List[dict]) -> Tuple[Dict[str, List[Word]], bool]:
+    """Words per field by x-center, and whether every word fell in the description column."""
+    cells: Dict[str, List[Word]] = {}
+    description_only = True
+    for word in line:
+        center = (word[0] + word[2]) / 2
+        column = next((c for c in columns if c["x0"] <= center < c["x1"]), None)
+        fields = column["fields"] if column else []
+        if "description" not in fields:
+            description_only = False
+        for field in fields:
+            cells.setdefault(field, []).append(word)
+    return cells, description_only
+
+
+def _finish_row(cells: Dict[str, List[Word]]) -> Optional[Dict[str, Any]]:
+    # Wrapped description lines may sit above the date line, so order by position
+    text = {field: " ".join(w[4] for w in sorted(words, key=lambda w: (round(w[1]), w[0])))
+            for field, words in cells.items()}
+    return build_row(
+        text.get("date"),
+        text.get("description"),
+        *(to_float(text.get(field)) for field in AMOUNT_FIELDS),
+    )
+
+
+def _row_bands(anchors: List[List[Word]], breaks: List[List[Word]], top: Optional[float]) -> List[Tuple[float, float]]:
+    """
+    Vertical extent of each row: halfway to the neighbouring rows' date lines,
+    half a row pitch past the first and last, and never across a line that is
+    neither a row nor a wrapped description (totals, footers).
+    """
+    centers = [(line[0][1] + line[0][3]) / 2 for line in anchors]
+    pitches = sorted(b - a for a, b in zip(centers, centers[1:]))
+    if pitches:
+        half = pitches[len(pitches) // 2] / 2
+    else:
+        half = 2 * (anchors[0][0][3] - anchors[0][0][1])
+    bands = []
+    for i, center in enumerate(centers):
+        lo = (centers[i - 1] + center) / 2 if i else max(center - half, top if top is not None else center - half)
+        hi = (center + centers[i + 1]) / 2 if i + 1 < len(centers) else center + half
+        for line in breaks:
+            if line[0][1] >= center:
+                hi = min(hi, line[0][1])
+            else:
+                lo = max(lo, line[0][3])
+        bands.append((lo, hi))
+    return bands
+
+
+def extract_page_rows(template: dict, words: List[Word]) -> Optional[List[Dict[str, Any]]]:
+    """Rows of one page, or None if the page has the header at the wrong positions."""
+    lines = group_lines(words)
+    start, top = 0, None
+    header_idx = find_header(lines)
+    if header_idx is not None:
+        if fingerprint(template["producer"], lines[header_idx]) != template["fingerprint"] \
+                or not _header_matches(template, lines[header_idx]):
+            return None
+        start, top = header_idx + 1, max(w[3] for w in lines[header_idx])
+
+    anchors, wrapped, breaks = [], [], []
+    for line in lines[start:]:
+        cells, description_only = _bucket(line, template["columns"])
+        if DATE_LIKE.match(" ".join(w[4] for w in cells.get("date", []))):
+            anchors.append((line, cells))
+        elif description_only and cells:
+            wrapped.append(line)
+        elif anchors or cells:
+            breaks.append(line)
+    if not anchors:
+        return []
+
+    # Wrapped descriptions can be centred on the row's single-line cells, so they are
+    # attached to the row whose band they overlap most rather than the line above
+    bands = _row_bands([line for line, _ in anchors], breaks, top)
+    for line in wrapped:
+        line_top, line_bottom = min(w[1] for w in line), max(w[3] for w in line)
+        overlaps = [min(hi, line_bottom) - max(lo, line_top) for lo, hi in bands]
+        best = max(range(len(bands)), key=lambda i: overlaps[i])
+        if overlaps[best] > 0:
+            anchors[best][1].setdefault("description", []).extend(line)
+
+    rows = [_finish_row(cells) for _, cells in anchors]
+    return [r for r in rows if r]
+
+
+def _extract(template: dict, pages: List[List[Word]]) -> Optional[List[Dict[str, Any]]]:
+    rows = []
+    for words in pages:
+        page_rows = extract_page_rows(template, words)
+        if page_rows is None:
+            return None
+        rows.extend(page_rows)
+    with_amount = sum(1 for r in rows if r["amount"] is not None)
+    if not rows or with_amount < MIN_AMOUNT_SHARE * len(rows):
+        return None
+    return rows
+
+
+def extract_with_template(pdf_bytes: bytes) -> Optional[List[Dict[str, Any]]]:
+    """
+    Rows of a statement in a known layout, or None when the layout is unknown or
+    doesn't match its template (the caller then runs the generic parser).
+    Never raises: a failure here counts as a miss for the template.
+    """
+    key = producer = None
+    try:
+        producer, first = read_words(pdf_bytes, max_pages=1)
+        if not first:
+            return None
+        lines = group_lines(first[0])
+        header_idx = find_header(lines)
+        if header_idx is None:
+            return None
+        template = find_template(fingerprint(producer, lines[header_idx]), lines[header_idx])
+        if not template or template.get("rejected"):
+            return None
+        key = template["id"]
+
+        _, pages = read_words(pdf_bytes)
+        rows = _extract(template, pages)
+    except Exception as e:
+        # The fast path is best effort; the generic parser still handles the statement
+        print(f"Statement layout template failed: {e}")
+        rows = None
+    if rows is None:
+        if key and layout_store.record_miss(key):
+            print(f"Statement layout {key} ({producer}) no longer matches its template; dropped it")
+        return None
+    layout_store.record_hit(key)
+    return rows
+
+
+# ---------------- Learning ----------------
+def _header_columns(pdf_bytes: bytes) -> Optional[List[dict]]:
+    """Column boundaries and fields from the header row of the first transaction table."""
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        if not pdf.pages:
+            return None
+        for table in pdf.pages[0].find_tables():
+            header = table.extract()[0] if table.rows else []
+            mapping = map_headers([normalize_header(h) for h in header])
+            if not _is_header(mapping):
+                continue
+            columns = []
+            for i, cell in enumerate(table.rows[0].cells):
+                if cell is None:
+                    continue
+                # A header can feed more than one field ("Withdrawal Amount": debit and amount)
+                columns.append({"fields": [f for f, idx in mapping.items() if idx == i], "x0": cell[0], "x1": cell[2]})
+            return columns
+    return None
+
+
+def _same_transactions(actual: pd.DataFrame, expected: pd.DataFrame) -> bool:
+    key = ["date", "debit", "credit", "amount", "balance"]
+    if not actual[key].equals(expected[key]):
+        return False
+    # Wrapped cells come back joined by newlines from tables and by spaces from words
+    normalize = lambda s: s.fillna("").astype(str).map(lambda text: " ".join(text.split()))
+    return normalize(actual["description"]).equals(normalize(expected["description"]))
+
+
+def learn_template(pdf_bytes: bytes, expected: pd.DataFrame) -> Optional[dict]:
+    """
+    Learns the layout of a statement the generic parser just handled. The template
+    is stored only if word bucketing gives the same transactions as `expected`;
+    otherwise the layout is remembered as rejected, and learning is retried
+    after a back-off that doubles with each rejection.
+    """
+    try:
+        producer, pages = read_words(pdf_bytes)
+        if not pages:
+            return None
+        lines = group_lines(pages[0])
+        header_idx = find_header(lines)
+        if header_idx is None:
+            return None
+        fp = fingerprint(producer, lines[header_idx])
+        known = find_template(fp, lines[header_idx])
+        if known and not (known.get("rejected") and known.get("rejected_until", 0) <= time.time()):
+            return None
+        columns = _header_columns(pdf_bytes)
+        if not columns:
+            return None
+
+        # A rejected template is replaced in place once its back-off has passed
+        key = known["id"] if known else template_id(fp, lines[header_idx])
+        header = [[w[4], w[0]] for w in lines[header_idx]]
+        template = {
+            "version": TEMPLATE_VERSION,
+            "id": key,
+            "fingerprint": fp,
+            "producer": producer,
+            "header": header,
+            "columns": columns,
+            "hits": 0,
+            "learned_at": time.time(),
+        }
+        rows = _extract(template, pages)
+        if rows is None or not _same_transactions(rows_to_frame(rows), expected):
+            rejections = (known or {}).get("rejections", 0) + 1
+            backoff = min(LAYOUT_REJECT_SECONDS * 2 ** (rejections - 1), LAYOUT_REJECT_MAX_SECONDS)
+            template = {"version": TEMPLATE_VERSION, "id": key, "fingerprint": fp, "producer": producer,
+                        "header": header, "rejected": True, "rejections": rejections, "rejected_until": time.time() + backoff,
+                        "learned_at": time.time()}
+        layout_store.put(template)
+        return template
+    except Exception as e:
+        # Learning is best effort; the statement itself was already parsed
+        print(f"Could not learn statement layout: {e}")
+        return None
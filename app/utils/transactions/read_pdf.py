@@ -1,7 +1,12 @@
 import io
+import multiprocessing
+import os
 import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from app.utils.transactions.categories import enrich_transactions
 import pandas as pd
 import pdfplumber
@@ -85,58 +90,91 @@ def open_pdf_as_bytes(path: str, password: Optional[str]) -> bytes:
     return raw
 
 # ---------------- Core extraction ----------------
-def extract_transactions_from_bytes(pdf_bytes: bytes) -> pd.DataFrame:
-    # print("starting the extraction...\n\n")
+LAYOUT_TEMPLATES_ENABLED = os.getenv("LAYOUT_TEMPLATES_ENABLED", "true").lower() in ("1", "true", "yes")
+
+def build_row(date: Optional[str], desc: Optional[str], debit: Optional[float], credit: Optional[float],
+              amount: Optional[float], balance: Optional[float]) -> Optional[Dict[str, Any]]:
+    """One transaction row from parsed cell values, or None if the date cell isn't a date."""
+    date = (date or "").strip()
+    desc = (desc or "").strip()
+
+    if amount is None:
+        if debit is not None and credit is None:
+            amount = -abs(debit)
+        elif credit is not None and debit is None:
+            amount = abs(credit)
+        elif debit is not None and credit is not None:
+            amount = abs(credit) if abs(credit) > abs(debit) else -abs(debit)
+
+    if not re.search(r"\d", date):
+        return None
+
+    return {
+        "date": date,
+        "description": re.sub(r"\s{2,}", " ", desc),
+        "debit": debit,
+        "credit": credit,
+        "amount": amount,
+        "balance": balance,
+    }
+
+def extract_rows_generic(pdf) -> List[Dict[str, Any]]:
+    """Table detection + header alias matching on every page of an open pdfplumber document."""
     rows = []
-    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-        for page in pdf.pages:
-            tables = []
-            primary = page.extract_table()
-            if primary: tables.append(primary)
-            tables += page.extract_tables()
-
-            for tbl in tables:
-                if not tbl or len(tbl) < 2:
-                    continue
-                header = [normalize_header(h) for h in tbl[0]]
-                mapping = map_headers(header)
-                if "date" not in mapping or "description" not in mapping:
-                    continue
-                if not (("amount" in mapping) or ("debit" in mapping) or ("credit" in mapping)):
+    for page in pdf.pages:
+        tables = []
+        primary = page.extract_table()
+        if primary: tables.append(primary)
+        tables += page.extract_tables()
+
+        for tbl in tables:
+            if not tbl or len(tbl) < 2:
+                continue
+            header = [normalize_header(h) for h in tbl[0]]
+            mapping = map_headers(header)
+            if "date" not in mapping or "description" not in mapping:
+                continue
+            if not (("amount" in mapping) or ("debit" in mapping) or ("credit" in mapping)):
+                continue
+
+            for r in tbl[1:]:
+                if not r or not any(r):
                     continue
+                get = lambda key: (r[mapping[key]] if key in mapping and mapping[key] < len(r) else None)
+                row = build_row(
+                    get("date"),
+                    get("description"),
+                    to_float(get("debit")) if "debit" in mapping else None,
+                    to_float(get("credit")) if "credit" in mapping else None,
+                    to_float(get("amount")) if "amount" in mapping else None,
+                    to_float(get("balance")) if "balance" in mapping else None,
+                )
+                if row:
+                    rows.append(row)
+    return rows
 
-                for r in tbl[1:]:
-                    if not r or not any(r):
-                        continue
-                    get = lambda key: (r[mapping[key]] if key in mapping and mapping[key] < len(r) else None)
-                    date = (get("date") or "").strip()
-                    desc = (get("description") or "").strip()
-
-                    debit = to_float(get("debit")) if "debit" in mapping else None
-                    credit = to_float(get("credit")) if "credit" in mapping else None
-                    amount = to_float(get("amount")) if "amount" in mapping else None
-                    balance = to_float(get("balance")) if "balance" in mapping else None
-
-                    if amount is None:
-                        if debit is not None and credit is None:
-                            amount = -abs(debit)
-                        elif credit is not None and debit is None:
-                            amount = abs(credit)
-                        elif debit is not None and credit is not None:
-                            amount = abs(credit) if abs(credit) > abs(debit) else -abs(debit)
-
-                    if not re.search(r"\d", date):
-                        continue
-
-                    rows.append({
-                        "date": date,
-                        "description": re.sub(r"\s{2,}", " ", desc),
-                        "debit": debit,
-                        "credit": credit,
-                        "amount": amount,
-                        "balance": balance,
-                    })
+def extract_transactions_from_bytes(pdf_bytes: bytes) -> pd.DataFrame:
+    # print("starting the extraction...\n\n")
+    rows = None
+    if LAYOUT_TEMPLATES_ENABLED:
+        from app.utils.transactions.layouts import extract_with_template
+        # Known bank layout: bucket words into stored columns, no table detection
+        rows = extract_with_template(pdf_bytes)
 
+    learn = False
+    if rows is None:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            rows = extract_rows_generic(pdf)
+        learn = LAYOUT_TEMPLATES_ENABLED and bool(rows)
+
+    df = rows_to_frame(rows)
+    if learn and not df.empty:
+        from app.utils.transactions.layouts import learn_template
+        # Remember this layout if word bucketing reproduces the generic result
+        learn_template(pdf_bytes, expected=df)
+    return df
+
+def rows_to_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
     df = pd.DataFrame(rows, columns=["date", "description", "debit", "credit", "amount", "balance"])
     if df.empty:
         return df
@@ -144,23 +182,32 @@ def extract_transactions_from_bytes(pdf_bytes: bytes) -> pd.DataFrame:
     df["date"] = df["date"].astype(str).apply(norm_date_to_iso)
     df["description"] = df["description"].astype(str).str.replace(r"\s{2,}", " ", regex=True).str.strip()
 
-    def clean_desc_for_key(s: str) -> str:
-        return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", s.lower().strip()))
+    return sort_transactions(dedup_transactions(df))
+
+# ---------------- Dedup & ordering ----------------
+def clean_desc_for_key(s: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", "", s.lower().strip()))
 
+def dedup_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Drops rows repeated across tables/pages (same date, description, amount and balance)."""
+    if df.empty:
+        return df
     key_cols = pd.DataFrame({
         "date": df["date"].astype(str),
         "desc_key": df["description"].astype(str).map(clean_desc_for_key),
         "amount": df["amount"].astype(object),
         "balance": df["balance"].astype(object),
     })
-    df = df[~key_cols.duplicated(keep="first")].reset_index(drop=True)
+    return df[~key_cols.duplicated(keep="first")].reset_index(drop=True)
 
+def sort_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return df
     try:
         df["_d"] = pd.to_datetime(df["date"], errors="coerce")
         df = df.sort_values(by=["_d", "amount", "description"], kind="stable").drop(columns=["_d"]).reset_index(drop=True)
     except Exception:
         pass
-
     return df
 
 # def extract_transactions_from_file(path: str, password: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -168,7 +215,7 @@ def extract_transactions_from_bytes(pdf_bytes: bytes) -> pd.DataFrame:
 #     df = extract_transactions_from_bytes(pdf_bytes)
 #     return enrich_transactions(df)
 
-def extract_transactions_from_uploaded_bytes(pdf_bytes: bytes, user_id, password: Optional[str] = None) -> List[Dict[str, Any]]:
+def decrypt_pdf_bytes(pdf_bytes: bytes, password: Optional[str] = None) -> bytes:
     if password and fitz:
         doc = fitz.open(stream=pdf_bytes, filetype="pdf")
         if doc.is_encrypted:
@@ -176,11 +223,77 @@ def extract_transactions_from_uploaded_bytes(pdf_bytes: bytes, user_id, password
                 raise ValueError("Invalid password")
             pdf_bytes = doc.tobytes()
         doc.close()
-    df = extract_transactions_from_bytes(pdf_bytes)
+    return pdf_bytes
+
+def extract_transactions_from_uploaded_bytes(pdf_bytes: bytes, user_id, password: Optional[str] = None) -> List[Dict[str, Any]]:
+    df = extract_transactions_from_bytes(decrypt_pdf_bytes(pdf_bytes, password))
     df['user_id'] = user_id
     # return df.to_dict(orient="records")
     return enrich_transactions(df)
 
+# ---------------- Batch (multi-statement) ----------------
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", 24))
+BATCH_MAX_UNZIPPED_BYTES = int(os.getenv("BATCH_MAX_UNZIPPED_BYTES", 200 * 1024 * 1024))  # all statements in a batch
+BATCH_PARSE_WORKERS = int(os.getenv("BATCH_PARSE_WORKERS", min(4, os.cpu_count() or 1)))
+
+@lru_cache(maxsize=1)
+def get_parse_executor() -> ProcessPoolExecutor:
+    """
+    Worker processes for parsing statements in parallel (pdfplumber is pure Python,
+    so threads would serialize on the GIL). Created on first batch upload.
+    Workers start from a forkserver rather than forking the threaded app process.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=BATCH_PARSE_WORKERS, mp_context=multiprocessing.get_context(method))
+
+def reset_parse_executor() -> None:
+    """Drops a pool whose worker died (BrokenProcessPool) so the next call builds a fresh one."""
+    if get_parse_executor.cache_info().currsize:
+        get_parse_executor().shutdown(wait=False, cancel_futures=True)
+    get_parse_executor.cache_clear()
+
+def extract_statement_frame(pdf_bytes: bytes, password: Optional[str] = None) -> pd.DataFrame:
+    """Parses one statement to its raw DataFrame. Top-level so it can run in a worker process."""
+    return extract_transactions_from_bytes(decrypt_pdf_bytes(pdf_bytes, password))
+
+def pdfs_from_zip(zip_bytes: bytes, max_files: int = BATCH_MAX_FILES,
+                  max_bytes: int = BATCH_MAX_UNZIPPED_BYTES) -> List[Tuple[str, bytes]]:
+    """
+    Returns (name, bytes) for each PDF inside a zip. `max_files` and `max_bytes`
+    are what is left of the batch limits; both are checked before anything is
+    decompressed.
+    """
+    pdfs = []
+    total = 0
+    try:
+        with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+            for info in zf.infolist():
+                name = info.filename
+                if info.is_dir() or not name.lower().endswith(".pdf") or name.startswith("__MACOSX/"):
+                    continue
+                if len(pdfs) >= max_files:
+                    raise ValueError(f"At most {BATCH_MAX_FILES} statements can be uploaded at once")
+                total += info.file_size
+                if total > max_bytes:
+                    raise ValueError(f"Statements can be at most {BATCH_MAX_UNZIPPED_BYTES // (1024 * 1024)} MB in total")
+                pdfs.append((Path(name).name, zf.read(info)))
+    except zipfile.BadZipFile:
+        raise ValueError("Uploaded file is not a valid zip archive")
+    return pdfs
+
+def merge_statement_frames(frames: List[pd.DataFrame], user_id) -> List[Dict[str, Any]]:
+    """
+    Combines several statements into one chronological list, dropping rows that
+    appear in more than one statement (overlapping periods) with the same key
+    used within a single statement.
+    """
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return []
+    df = sort_transactions(dedup_transactions(pd.concat(frames, ignore_index=True)))
+    df['user_id'] = user_id
+    return enrich_transactions(df)
+
 # ---------------- CLI (for testing only) ----------------
 # if __name__ == "__main__":
 #     import sys
@@ -0,0 +1,197 @@
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+# ---------------- Configuration ----------------
+# name -> (period in days, allowed deviation in days, monthly multiplier)
+PERIODS = {
+    "weekly": (7, 2, 30.44 / 7),
+    "fortnightly": (14, 3, 30.44 / 14),
+    "monthly": (30.44, 5, 1.0),
+    "quarterly": (91.31, 12, 1 / 3),
+    "yearly": (365.25, 20, 1 / 12),
+}
+MIN_OCCURRENCES = 3
+MIN_OCCURRENCES_YEARLY = 2
+MIN_REGULAR_SHARE = 0.75   # share of gaps that must be within tolerance of the period
+MAX_AMOUNT_CV = 0.25       # coefficient of variation allowed for "the same" payment
+FINGERPRINT_WORDS = 4
+
+KIND_KEYWORDS = {
+    "sip": ["sip", "mutual", "bse ltd", "nse clearing", "groww", "zerodha", "kuvera", "coin", "amc", "mf"],
+    "emi": ["emi", "loan", "finance ltd", "bajaj", "home fin", "nach"],
+    "rent": ["rent", "nobroker", "landlord"],
+    "insurance": ["insurance", "lic", "premium", "policy"],
+    "subscription": ["netflix", "spotify", "prime", "hotstar", "youtube", "apple", "google", "jio", "airtel",
+                     "subscription", "zee5", "sonyliv", "broadband"],
+}
+
+
+# ---------------- Helpers ----------------
+def _column(frame: pd.DataFrame, *names) -> pd.Series:
+    # Rows come either from the DB (txn_date/category) or straight from extraction (date/categories)
+    for name in names:
+        if name in frame.columns:
+            return frame[name]
+    return pd.Series([None] * len(frame), index=frame.index, dtype=object)
+
+
+# Whole tokens made only of letters, '@' and '.', between separators; drops ids, refs and amounts
+_WORD_TOKEN = re.compile(r"(?<![^\s/\-_|])[a-z@\.]+(?![^\s/\-_|])")
+
+
+def _description_key(description: str) -> str:
+    return " ".join(_WORD_TOKEN.findall(description.lower())[:FINGERPRINT_WORDS])
+
+
+def _fingerprints(descriptions: pd.Series, counterparties: pd.Series) -> pd.Series:
+    """UPI handle when there is one, else the first few words of the description with ids stripped."""
+    handles = counterparties.where(counterparties.str.contains("@", na=False), None).str.lower()
+    missing = handles.isna()
+    # Only rows without a handle pay for the description regexes
+    return handles.where(~missing, descriptions[missing].map(_description_key))
+
+
+def payee_key(description: str, counterparty: Any) -> str:
+    """Single-transaction version of the fingerprint used to group payments to the same payee."""
+    if isinstance(counterparty, str) and "@" in counterparty:
+        return counterparty.lower()
+    return _description_key(description or "")
+
+
+KIND_PATTERNS = {kind: re.compile(r"\b(" + "|".join(re.escape(k) for k in keywords) + r")\b")
+                 for kind, keywords in KIND_KEYWORDS.items()}
+
+
+def _classify_kind(text: str) -> str:
+    text = text.lower()
+    for kind, pattern in KIND_PATTERNS.items():
+        if pattern.search(text):
+            return kind
+    return "other"
+
+
+# ---------------- Detection ----------------
+def detect_recurring_payments(transactions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Finds recurring debits (SIPs, EMIs, rent, subscriptions) in a user's history.
+
+    Debits are grouped by counterparty / description fingerprint and each group is
+    checked for a regular interval and a stable amount. All per-group statistics
+    are computed with array ops over the sorted dates, so years of history take
+    milliseconds.
+    """
+    if not transactions:
+        return []
+
+    raw = pd.DataFrame.from_records(transactions)
+    counterparty = [c.get("counterparty") if isinstance(c, dict) else None for c in _column(raw, "categories", "category")]
+    df = pd.DataFrame({
+        "date": pd.to_datetime(_column(raw, "txn_date", "date"), errors="coerce"),
+        "description": _column(raw, "description").fillna("").astype(str),
+        "counterparty": pd.Series([c if isinstance(c, str) else None for c in counterparty], index=raw.index, dtype=object),
+        "amount": pd.to_numeric(_column(raw, "amount"), errors="coerce"),
+        "debit": pd.to_numeric(_column(raw, "debit"), errors="coerce"),
+    })
+    # Outflows only: a debit column value, or a negative signed amount
+    outflow = df["debit"].where(df["debit"] > 0, -df["amount"].where(df["amount"] < 0))
+    df = df.assign(outflow=outflow).dropna(subset=["date", "outflow"])
+    if df.empty:
+        return []
+
+    df = df.assign(key=_fingerprints(df["description"], df["counterparty"]))
+    df = df[df["key"].str.len() > 0]
+    df = df.assign(day=df["date"].values.astype("datetime64[D]").astype(np.int64))
+
+    # Several payments to the same payee on one day count as one occurrence
+    daily = (df.groupby(["key", "day"], sort=True)
+               .agg(outflow=("outflow", "sum"), description=("description", "last"))
+               .reset_index())
+    codes, keys = pd.factorize(daily["key"], sort=False)
+    days = daily["day"].to_numpy()
+    amounts = daily["outflow"].to_numpy(dtype=float)
+    n_groups = len(keys)
+
+    counts = np.bincount(codes, minlength=n_groups)
+    candidate = counts >= MIN_OCCURRENCES_YEARLY
+    if not candidate.any():
+        return []
+
+    # Gaps between consecutive occurrences within the same group
+    same_group = codes[1:] == codes[:-1]
+    gaps = np.diff(days)[same_group].astype(float)
+    gap_codes = codes[1:][same_group]
+    median_gap = pd.Series(gaps).groupby(gap_codes).median().reindex(range(n_groups)).to_numpy()
+
+    # Snap each group's median gap to the nearest known period
+    period_names = list(PERIODS)
+    period_days = np.array([PERIODS[p][0] for p in period_names])
+    period_tol = np.array([PERIODS[p][1] for p in period_names])
+    nearest = np.abs(median_gap[:, None] - period_days[None, :]).argmin(axis=1)
+    has_period = ~np.isnan(median_gap) & (np.abs(median_gap - period_days[nearest]) <= period_tol[nearest])
+
+    # Share of gaps within tolerance of the group's period
+    gap_ok = np.abs(gaps - period_days[nearest][gap_codes]) <= period_tol[nearest][gap_codes]
+    regular_share = np.bincount(gap_codes, weights=gap_ok, minlength=n_groups) / np.maximum(counts - 1, 1)
+
+    # Amount stability: coefficient of variation per group
+    amount_sum = np.bincount(codes, weights=amounts, minlength=n_groups)
+    amount_sq = np.bincount(codes, weights=amounts ** 2, minlength=n_groups)
+    mean_amount = amount_sum / np.maximum(counts, 1)
+    variance = np.maximum(amount_sq / np.maximum(counts, 1) - mean_amount ** 2, 0)
+    cv = np.sqrt(variance) / np.where(mean_amount > 0, mean_amount, 1)
+    median_amount = pd.Series(amounts).groupby(codes).median().to_numpy()
+
+    is_yearly = np.array(period_names)[nearest] == "yearly"
+    min_count = np.where(is_yearly, MIN_OCCURRENCES_YEARLY, MIN_OCCURRENCES)
+    recurring = candidate & has_period & (counts >= min_count) & (regular_share >= MIN_REGULAR_SHARE) & (cv <= MAX_AMOUNT_CV)
+    if not recurring.any():
+        return []
+
+    # Group boundaries in the sorted arrays
+    first_idx = np.r_[0, np.flatnonzero(~same_group) + 1]
+    last_idx = np.r_[first_idx[1:] - 1, len(codes) - 1]
+    reference_day = int(days.max())
+    epoch = date(1970, 1, 1)
+
+    results = []
+    for g in np.flatnonzero(recurring):
+        period = period_names[nearest[g]]
+        last_day = int(days[last_idx[g]])
+        next_day = last_day + int(round(median_gap[g]))
+        monthly = float(median_amount[g]) * PERIODS[period][2]
+        description = daily["description"].iat[last_idx[g]]
+        results.append({
+            "counterparty": keys[g],
+            "description": description,
+            "kind": _classify_kind(f"{keys[g]} {description}"),
+            "frequency": period,
+            "interval_days": round(float(median_gap[g]), 1),
+            "occurrences": int(counts[g]),
+            "typical_amount": round(float(median_amount[g]), 2),
+            "amount_variation": round(float(cv[g]), 3),
+            "fixed_amount": bool(cv[g] < 0.02),
+            "monthly_amount": round(monthly, 2),
+            "first_date": (epoch + timedelta(days=int(days[first_idx[g]]))).isoformat(),
+            "last_date": (epoch + timedelta(days=last_day)).isoformat(),
+            "next_expected_date": (epoch + timedelta(days=next_day)).isoformat(),
+            # Still running if the next payment isn't overdue by more than half a period
+            "active": bool(reference_day <= last_day + 1.5 * median_gap[g]),
+        })
+    results.sort(key=lambda r: r["monthly_amount"], reverse=True)
+    return results
+
+
+def summarize_recurring(recurring: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Monthly committed outflow from the active recurring payments, in total and per kind."""
+    active = [r for r in recurring if r["active"]]
+    by_kind: Dict[str, float] = {}
+    for r in active:
+        by_kind[r["kind"]] = round(by_kind.get(r["kind"], 0) + r["monthly_amount"], 2)
+    return {
+        "count": len(active),
+        "monthly_committed": round(sum(r["monthly_amount"] for r in active), 2),
+        "by_kind": by_kind,
+    }
@@ -0,0 +1,347 @@
+# fake_services.py
+"""
+Local stand-ins for the external services the backend talks to, so the load test
+never leaves the machine:
+
+- OpenAI chat completions        (point OPENAI_BASE_URL at `<url>/v1`)
+- Gemini generateContent (REST)  (point GEMINI_API_ENDPOINT at `<url>`)
+- Supabase / PostgREST           (point SUPABASE_URL at `<url>`)
+- indianapi.in market data       (point INDIAN_STOCK_API_URL at `<url>`)
+
+Every service takes a latency (ms) and jitter (ms) that is slept before answering,
+to mimic real upstream response times.
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# (method, path, query pairs, JSON body, headers) -> (status, JSON payload). Query stays a list of
+# pairs because PostgREST repeats keys (txn_date=gte.X&txn_date=lte.Y).
+Handler = Callable[[str, str, List[Tuple[str, str]], Optional[object], Dict[str, str]], Tuple[int, object]]
+
+
+class FakeService:
+    """A tiny threaded HTTP server that answers JSON using `handler`."""
+
+    def __init__(self, name: str, handler: Handler, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.name = name
+        self.handler = handler
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.requests = 0
+        self._lock = threading.Lock()
+        service = self
+
+        class _RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _dispatch(self, method: str):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = None
+                if raw:
+                    try:
+                        body = json.loads(raw)
+                    except ValueError:
+                        body = raw
+                parts = urlsplit(self.path)
+                query = parse_qsl(parts.query, keep_blank_values=True)
+                with service._lock:
+                    service.requests += 1
+                service._sleep()
+                status, payload = service.handler(method, parts.path, query, body, dict(self.headers))
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"fake-{name}", daemon=True)
+
+    def _sleep(self):
+        delay = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeService":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---------------- OpenAI ----------------
+FAKE_ADVICE = {
+    "market_insight": "Markets are range-bound with a mildly positive bias.",
+    "summary": "Split monthly savings between a large-cap index fund and a flexi-cap fund.",
+    "recommended_monthly_sip": "10000 INR",
+    "recommendations": [
+        {"instrument_name": "Nifty 50 Index Fund", "type": "Mutual Fund",
+         "reasoning": "Low-cost core holding.", "risk_level_match": "Suits moderate risk."},
+    ],
+    "disclaimer": "This is AI-generated advice for informational purposes only.",
+}
+
+
+def openai_handler(method, path, query, body, headers):
+    if method == "POST" and path.endswith("/chat/completions"):
+        body = body or {}
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = json.dumps(FAKE_ADVICE) if json_mode else "A SIP is a systematic investment plan: you invest a fixed amount every month."
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+        return 200, {
+            "id": f"chatcmpl-fake-{random.randint(0, 10**9)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (prompt_chars + len(content)) // 4},
+        }
+    return 404, {"error": {"message": f"Unknown route {method} {path}"}}
+
+
+# ---------------- Gemini ----------------
+def gemini_handler(method, path, query, body, headers):
+    if method == "POST" and path.endswith(":generateContent"):
+        return 200, {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": json.dumps(FAKE_ADVICE)}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {"promptTokenCount": 100, "candidatesTokenCount": 50, "totalTokenCount": 150},
+        }
+    return 404, {"error": {"message": f"Unknown route {method} {path}"}}
+
+
+# ---------------- Supabase / PostgREST ----------------
+class PostgrestStore:
+    """In-memory tables understanding the subset of PostgREST the app uses."""
+
+    def __init__(self):
+        self.tables: Dict[str, List[dict]] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _value(row: dict, column: str):
+        # Supports JSON paths like category->>category
+        if "->>" in column:
+            column, _, key = column.partition("->>")
+            doc = row.get(column)
+            value = doc.get(key) if isinstance(doc, dict) else None
+            return None if value is None else str(value)
+        return row.get(column)
+
+    @classmethod
+    def _compare(cls, row: dict, column: str, op: str, value: str) -> bool:
+        current = cls._value(row, column)
+        if op == "eq":
+            return str(current) == value
+        if op in ("gt", "gte", "lt", "lte"):
+            if current is None:
+                return False
+            try:
+                left, right = float(current), float(value)
+            except (TypeError, ValueError):
+                left, right = str(current), value
+            return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+        return True
+
+    @staticmethod
+    def _split_top_level(expr: str) -> List[str]:
+        parts, depth, current = [], 0, ""
+        for ch in expr:
+            if ch == "," and depth == 0:
+                parts.append(current)
+                current = ""
+                continue
+            depth += ch == "("
+            depth -= ch == ")"
+            current += ch
+        if current:
+            parts.append(current)
+        return parts
+
+    @classmethod
+    def _logic(cls, row: dict, mode: str, expr: str) -> bool:
+        """Evaluates PostgREST logic trees: or=(a.gt.1,and(b.eq.2,c.gt.3))."""
+        results = []
+        for part in cls._split_top_level(expr.strip()[1:-1]):
+            if part.startswith(("and(", "or(")):
+                sub_mode, _, rest = part.partition("(")
+                results.append(cls._logic(row, sub_mode, "(" + rest))
+            else:
+                column, op, value = part.split(".", 2)
+                results.append(cls._compare(row, column, op, value))
+        return any(results) if mode == "or" else all(results)
+
+    @classmethod
+    def _matches(cls, row: dict, filters: List[Tuple[str, str]]) -> bool:
+        for column, expr in filters:
+            if column in ("or", "and"):
+                if not cls._logic(row, column, expr):
+                    return False
+                continue
+            op, _, value = expr.partition(".")
+            if not cls._compare(row, column, op, value):
+                return False
+        return True
+
+    def handle(self, method, path, query, body, headers):
+        m = re.match(r"^/rest/v1/(\w+)$", path)
+        if not m:
+            return 404, {"message": f"Unknown route {method} {path}"}
+        table = m.group(1)
+        reserved = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+        filters = [(k, v) for k, v in query if k not in reserved]
+        query = dict(query)
+
+        with self._lock:
+            rows = self.tables.setdefault(table, [])
+            if method == "GET":
+                result = [r for r in rows if self._matches(r, filters)]
+                if "order" in query:
+                    for part in reversed(query["order"].split(",")):
+                        column, _, direction = part.partition(".")
+                        result.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=direction.startswith("desc"))
+                if "limit" in query:
+                    result = result[:int(query["limit"])]
+                columns = query.get("select", "*")
+                if columns != "*":
+                    wanted = columns.split(",")
+                    result = [{c: r.get(c) for c in wanted} for r in result]
+                return 200, result
+
+            if method == "POST":
+                incoming = body if isinstance(body, list) else [body or {}]
+                conflict = [c for c in query.get("on_conflict", "").split(",") if c]
+                prefer = next((v for k, v in headers.items() if k.lower() == "prefer"), "")
+                ignore_duplicates = "resolution=ignore-duplicates" in prefer
+                stored = []
+                for row in incoming:
+                    row = dict(row)
+                    existing = next((i for i, r in enumerate(rows) if conflict and all(r.get(c) == row.get(c) for c in conflict)), None)
+                    if existing is not None:
+                        if not ignore_duplicates:
+                            rows[existing] = {**rows[existing], **row}
+                            stored.append(rows[existing])
+                        continue
+                    row.setdefault("id", self._next_id)
+                    self._next_id += 1
+                    rows.append(row)
+                    stored.append(row)
+                return 201, stored
+
+            if method == "PATCH":
+                updated = []
+                for r in rows:
+                    if self._matches(r, filters):
+                        r.update(body or {})
+                        updated.append(r)
+                return 200, updated
+
+            if method == "DELETE":
+                kept = [r for r in rows if not self._matches(r, filters)]
+                removed = len(rows) - len(kept)
+                self.tables[table] = kept
+                return 200, [{}] * removed
+        return 405, {"message": "Method not allowed"}
+
+
+# ---------------- indianapi.in ----------------
+def _stock(name: str, price: float, change: float) -> dict:
+    return {"company": name, "price": price, "percent_change": change, "overall_rating": "Bullish",
+            "ticker": name[:4].upper(), "volume": 1_000_000, "year_high": price * 1.2, "year_low": price * 0.8}
+
+
+MARKET_DATA = {
+    "/BSE_most_active": [_stock(n, p, c) for n, p, c in [
+        ("Reliance Industries", 2950.5, 1.2), ("HDFC Bank", 1650.1, -0.4), ("Infosys", 1520.0, 0.8),
+        ("Tata Motors", 980.2, 2.1), ("ITC", 430.6, -0.2), ("Adani Ports", 1340.0, 1.5)]],
+    "/NSE_most_active": [_stock(n, p, c) for n, p, c in [
+        ("State Bank of India", 820.3, 0.6), ("ICICI Bank", 1210.4, 0.3), ("TCS", 4100.0, -0.7),
+        ("Bharti Airtel", 1560.8, 1.1), ("Larsen & Toubro", 3600.2, 0.2), ("Wipro", 520.1, -1.0)]],
+    "/mutual_funds": {
+        "Equity": {
+            "Large Cap": [{"fund_name": f"Large Cap Fund {i}", "1_year_return": 12.0 + i, "3_year_return": 14.0 + i}
+                          for i in range(5)],
+            "Flexi Cap": [{"fund_name": f"Flexi Cap Fund {i}", "1_year_return": 15.0 + i, "3_year_return": 16.0 + i}
+                          for i in range(5)],
+        },
+        "Debt": {"Liquid": [{"fund_name": "Liquid Fund", "1_year_return": 7.1, "3_year_return": 6.5}]},
+    },
+    "/news": [{"title": f"Market headline {i}", "summary": "Indices closed higher on banking gains. " * 3,
+               "url": f"https://example.com/news/{i}"} for i in range(8)],
+}
+
+
+def indianapi_handler(method, path, query, body, headers):
+    if method == "GET" and path in MARKET_DATA:
+        return 200, MARKET_DATA[path]
+    return 404, {"error": f"Unknown route {method} {path}"}
+
+
+# ---------------- Assembly ----------------
+def start_fake_services(latency: Optional[Dict[str, float]] = None, jitter: Optional[Dict[str, float]] = None) -> Dict[str, FakeService]:
+    """Starts all four stand-ins on free ports. `latency`/`jitter` are keyed by service name."""
+    latency = latency or {}
+    jitter = jitter or {}
+    store = PostgrestStore()
+    handlers = {
+        "openai": openai_handler,
+        "gemini": gemini_handler,
+        "supabase": store.handle,
+        "indianapi": indianapi_handler,
+    }
+    services = {}
+    for name, handler in handlers.items():
+        services[name] = FakeService(name, handler, latency.get(name, 0.0), jitter.get(name, 0.0)).start()
+    services["supabase"].store = store
+    return services
+
+
+def service_env(services: Dict[str, FakeService]) -> Dict[str, str]:
+    """Environment variables that point the app at the running stand-ins."""
+    return {
+        "OPENAI_API_KEY": "fake-openai-key",
+        "OPENAI_BASE_URL": f"{services['openai'].url}/v1",
+        "GEMINI_API_KEY": "fake-gemini-key",
+        "GEMINI_API_ENDPOINT": services["gemini"].url,
+        "SUPABASE_URL": services["supabase"].url,
+        "SUPABASE_SERVICE_ROLE_KEY": "fake-service-role-key",
+        "INDIAN_STOCK_API_KEY": "fake-indianapi-key",
+        "INDIAN_STOCK_API_URL": services["indianapi"].url,
+    }
@@ -0,0 +1,104 @@
+# harness.py
+"""
+Timing helpers shared by the micro-benchmarks and the load test, plus the JSON
+baseline format used to spot regressions between runs.
+"""
+import json
+import math
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms: List[float], elapsed_s: Optional[float] = None, errors: int = 0) -> dict:
+    values = sorted(latencies_ms)
+    total = sum(values)
+    summary = {
+        "runs": len(values),
+        "errors": errors,
+        "mean_ms": round(total / len(values), 3) if values else 0.0,
+        "min_ms": round(values[0], 3) if values else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+    }
+    if elapsed_s:
+        summary["throughput_rps"] = round(len(values) / elapsed_s, 2)
+    return summary
+
+
+def measure(fn: Callable[[], object], repeat: int = 10, warmup: int = 1) -> dict:
+    """Calls `fn` `warmup + repeat` times and summarizes the timed runs."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# ---------------- Baselines ----------------
+def load_baseline(path: Path) -> dict:
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def write_baseline(path: Path, suite: str, results: Dict[str, dict], params: Optional[dict] = None) -> None:
+    """Stores `results` under `suite`, keeping whatever other suites the file already holds."""
+    path = Path(path)
+    data = load_baseline(path)
+    data[suite] = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": params or {},
+        "results": results,
+    }
+    path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+def compare(baseline: dict, suite: str, results: Dict[str, dict], tolerance: float = 0.2,
+            metrics=("p50_ms", "p95_ms", "p99_ms")) -> List[str]:
+    """Returns human-readable regressions: latencies more than `tolerance` slower than the baseline."""
+    previous = (baseline.get(suite) or {}).get("results", {})
+    regressions = []
+    for name, current in results.items():
+        before = previous.get(name)
+        if not before:
+            continue
+        for metric in metrics:
+            old, new = before.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"{suite}/{name} {metric}: {old:.2f} -> {new:.2f} ({(new / old - 1) * 100:+.0f}%)")
+        old_rps, new_rps = before.get("throughput_rps"), current.get("throughput_rps")
+        if old_rps and new_rps is not None and new_rps < old_rps * (1 - tolerance):
+            regressions.append(f"{suite}/{name} throughput_rps: {old_rps:.2f} -> {new_rps:.2f}")
+    return regressions
+
+
+def print_table(results: Dict[str, dict]) -> None:
+    print(f"{'benchmark':<28}{'runs':>6}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'rps':>10}")
+    for name, r in results.items():
+        rps = r.get("throughput_rps")
+        print(f"{name:<28}{r['runs']:>6}{r['p50_ms']:>11.2f}{r['p95_ms']:>11.2f}{r['p99_ms']:>11.2f}"
+              f"{(f'{rps:.1f}' if rps is not None else '-'):>10}")
@@ -0,0 +1,184 @@
+# load_test.py
+"""
+End-to-end load test: runs the FastAPI app under uvicorn against the local fake
+OpenAI / Gemini / Supabase / indianapi.in services and records throughput and
+p50/p95/p99 latency per endpoint.
+
+    python -m benchmarks.load_test --requests 200 --concurrency 16
+    python -m benchmarks.load_test --openai-latency 800 --supabase-latency 40 --record
+    python -m benchmarks.load_test --compare --tolerance 0.25
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict
+
+import httpx
+import jwt
+
+from benchmarks.fake_services import service_env, start_fake_services
+from benchmarks.harness import DEFAULT_BASELINE, compare, load_baseline, print_table, summarize, write_baseline
+from benchmarks.synthetic_pdf import BANK_LAYOUTS, generate_statement_pdf
+
+SUITE = "load"
+JWT_SECRET = "load-test-secret"
+
+
+def make_token(user_id: str) -> str:
+    payload = {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 3600, "email": f"{user_id}@example.com"}
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_app(env: Dict[str, str], port: int, workers: int, show_logs: bool = False) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+           "--workers", str(workers), "--log-level", "warning"]
+    # The routes print debug output per request; keep it off the benchmark report by default
+    stdout = None if show_logs else subprocess.DEVNULL
+    return subprocess.Popen(cmd, env={**os.environ, **env}, stdout=stdout)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0) -> float:
+    """Polls `/` until the app answers; returns the startup time in seconds."""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(f"{base_url}/", timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"App did not become ready within {timeout}s")
+
+
+# ---------------- Scenarios ----------------
+def build_scenarios(pdf_bytes: bytes, batch: list) -> Dict[str, Callable[[httpx.AsyncClient, int], "asyncio.Future"]]:
+    def auth(i: int) -> dict:
+        # Spread requests over a handful of users, like real traffic
+        return {"Authorization": f"Bearer {make_token(f'load-user-{i % 8}')}"}
+
+    async def root(client, i):
+        return await client.get("/")
+
+    async def extract(client, i):
+        files = {"pdf": ("statement.pdf", pdf_bytes, "application/pdf")}
+        return await client.post("/finance/extract-transactions", files=files, headers=auth(i))
+
+    async def extract_batch(client, i):
+        files = [("files", (f"statement-{n}.pdf", data, "application/pdf")) for n, data in enumerate(batch)]
+        return await client.post("/finance/extract-transactions/batch", files=files, headers=auth(i))
+
+    async def advice(client, i):
+        body = {"risk_profile": "Moderate", "investment_goal": "Wealth Creation", "investment_horizon": "Long-term (7+ years)"}
+        return await client.post("/finance/generate-advice", json=body, headers=auth(i))
+
+    async def chat(client, i):
+        return await client.post("/chat/query", json={"query": "What is SIP?"}, headers=auth(i))
+
+    async def recurring(client, i):
+        return await client.get("/finance/recurring", headers=auth(i))
+
+    return {"root": root, "extract": extract, "batch": extract_batch, "advice": advice, "chat": chat,
+            "recurring": recurring}
+
+
+async def run_scenario(base_url: str, scenario, total: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                t0 = time.perf_counter()
+                try:
+                    res = await scenario(client, i)
+                    ok = res.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if not ok:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end load test")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default="root,extract,batch,advice,chat,recurring")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--app-logs", action="store_true", help="show the app's stdout")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=30)
+    parser.add_argument("--layout", choices=sorted(BANK_LAYOUTS), default="hdfc")
+    parser.add_argument("--batch-size", type=int, default=3, help="statements per batch upload")
+    for service in ("openai", "gemini", "supabase", "indianapi"):
+        parser.add_argument(f"--{service}-latency", type=float, default=0.0, help="ms added to every response")
+        parser.add_argument(f"--{service}-jitter", type=float, default=0.0, help="± ms of random jitter")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    services_cfg = ("openai", "gemini", "supabase", "indianapi")
+    latency = {s: getattr(args, f"{s}_latency") for s in services_cfg}
+    jitter = {s: getattr(args, f"{s}_jitter") for s in services_cfg}
+    services = start_fake_services(latency, jitter)
+
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = start_app({**service_env(services), "JWT_SECRET": JWT_SECRET}, port, args.workers, args.app_logs)
+    try:
+        startup_s = wait_until_ready(base_url)
+        print(f"App ready in {startup_s:.2f}s")
+
+        # Same seed, growing page counts: each statement overlaps the previous one
+        batch = [generate_statement_pdf(args.pages + n, args.rows, args.layout) for n in range(args.batch_size)]
+        scenarios = build_scenarios(generate_statement_pdf(args.pages, args.rows, args.layout), batch)
+        results = {}
+        for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+            if name not in scenarios:
+                parser.error(f"unknown scenario '{name}'")
+            results[name] = asyncio.run(run_scenario(base_url, scenarios[name], args.requests, args.concurrency))
+        print_table(results)
+        for name, r in results.items():
+            if r["errors"]:
+                print(f"WARNING {name}: {r['errors']} failed requests")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+        for service in services.values():
+            service.stop()
+
+    params = {"requests": args.requests, "concurrency": args.concurrency, "workers": args.workers,
+              "pages": args.pages, "rows": args.rows, "layout": args.layout, "batch_size": args.batch_size,
+              "latency_ms": latency, "jitter_ms": jitter, "startup_s": round(startup_s, 3)}
+    if args.compare:
+        regressions = compare(load_baseline(args.baseline), SUITE, results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+    if args.record:
+        write_baseline(args.baseline, SUITE, results, params)
+        print(f"Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# micro.py
+"""
+Micro-benchmarks for the statement pipeline: PDF extraction (generic table
+detection vs a learned layout template), categorization, dedup,
+`analyze_transactions`, recurring-payment detection and transaction export
+(JSON vs streamed CSV/Parquet) over a long synthetic history. Runs fully
+offline on synthetic statements.
+
+    python -m benchmarks.micro --pages 20 --rows 40 --layout hdfc
+    python -m benchmarks.micro --record            # save as the new baseline
+    python -m benchmarks.micro --compare           # fail on >20% regressions
+"""
+import argparse
+import io
+import random
+import sys
+from datetime import timedelta
+
+import pandas as pd
+import pdfplumber
+from fastapi.encoders import jsonable_encoder
+
+from app.utils.advice_generator import analyze_transactions
+from app.utils.transactions.categories import enrich_transactions, parse_transaction
+from app.utils.transactions.export import export_chunks
+from app.utils.transactions.read_pdf import dedup_transactions, extract_rows_generic, extract_transactions_from_bytes, rows_to_frame
+from app.utils.transactions.recurring import detect_recurring_payments
+from benchmarks.harness import DEFAULT_BASELINE, compare, load_baseline, measure, print_table, write_baseline
+from benchmarks.synthetic_pdf import BANK_LAYOUTS, generate_rows, generate_statement_pdf
+
+SUITE = "micro"
+
+# (description, period in days, typical amount) of payees paid on a schedule, so
+# detect_recurring exercises its period and amount checks, not just the early exit
+RECURRING_PAYEES = [
+    ("NACH DR HDFC HOME FINANCE EMI {ref}", 30, 24500.0),
+    ("BSE LTD SIP MUTUAL FUND {ref}", 30, 5000.0),
+    ("UPIOUT/{ref}/netflix@hdfcbank/Subscription", 30, 649.0),
+    ("POS {ref} SWIGGY INSTAMART/5411", 7, 850.0),
+    ("LIC OF INDIA PREMIUM POLICY {ref}", 365, 18200.0),
+]
+
+
+def synthetic_history(count: int) -> list:
+    """
+    `count` categorized transactions shaped like rows read back from the database,
+    plus monthly, weekly and yearly payments to the RECURRING_PAYEES over the same span.
+    """
+    rows = generate_rows(count, seed=7)
+    rng = random.Random(7)
+    first, last = rows[0]["date"], rows[-1]["date"]
+    for description, period, amount in RECURRING_PAYEES:
+        day = first + timedelta(days=rng.randrange(period))
+        while day <= last:
+            paid = round(amount * rng.uniform(0.97, 1.03), 2)
+            rows.append({"date": day + timedelta(days=rng.randint(-1, 1)), "debit": paid, "credit": None,
+                         "amount": -paid, "description": description.format(ref=rng.randint(10**9, 10**12 - 1))})
+            day += timedelta(days=period)
+    rows.sort(key=lambda r: r["date"])
+
+    history = []
+    for r in rows:
+        history.append({"txn_date": r["date"].isoformat(), "description": r["description"], "debit": r["debit"],
+                        "credit": r["credit"], "amount": r["amount"], "category": parse_transaction(r["description"])})
+    return history
+
+
+def run(pages: int, rows: int, layout: str, repeat: int, history_rows: int) -> dict:
+    pdf_bytes = generate_statement_pdf(pages, rows, layout)
+    df = extract_transactions_from_bytes(pdf_bytes)
+    # Overlapping statements: every row appears twice
+    doubled = pd.concat([df, df], ignore_index=True)
+    enriched = enrich_transactions(df)
+    history = synthetic_history(history_rows)
+
+    def extract_generic():
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            return rows_to_frame(extract_rows_generic(pdf))
+
+    # The warm-up extraction learns the layout, so the timed runs take the template path
+    results = {
+        "extract_transactions_generic": measure(extract_generic, repeat=max(1, repeat // 5)),
+        "extract_transactions": measure(lambda: extract_transactions_from_bytes(pdf_bytes), repeat=max(1, repeat // 5)),
+        "enrich_transactions": measure(lambda: enrich_transactions(df), repeat=repeat),
+        "dedup_transactions": measure(lambda: dedup_transactions(doubled), repeat=repeat),
+        "analyze_transactions": measure(lambda: analyze_transactions(enriched), repeat=repeat),
+    }
+    for r in results.values():
+        r["rows"] = len(df)
+    recurring = detect_recurring_payments(history)
+    assert recurring, "synthetic history has no recurring payees; detect_recurring would only time its early exit"
+    results["detect_recurring"] = {**measure(lambda: detect_recurring_payments(history), repeat=repeat),
+                                   "rows": len(history), "found": len(recurring)}
+
+    # Export paths, fed 1000-row pages as iter_transactions would
+    pages = [history[i:i + 1000] for i in range(0, len(history), 1000)]
+    exports = {
+        "export_json": lambda: jsonable_encoder(history),
+        "export_csv": lambda: sum(len(c) for c in export_chunks(pages, "csv")),
+    }
+    try:
+        import pyarrow  # noqa: F401
+        exports["export_parquet"] = lambda: sum(len(c) for c in export_chunks(pages, "parquet"))
+    except ImportError:
+        pass
+    for name, fn in exports.items():
+        results[name] = {**measure(fn, repeat=max(1, repeat // 5)), "rows": len(history)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statement pipeline micro-benchmarks")
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=40, help="transactions per page")
+    parser.add_argument("--layout", choices=sorted(BANK_LAYOUTS), default="hdfc")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--history-rows", type=int, default=20000, help="rows of history for detect_recurring")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--record", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="exit non-zero on regressions vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    params = {"pages": args.pages, "rows": args.rows, "layout": args.layout, "repeat": args.repeat,
+              "history_rows": args.history_rows}
+    results = run(args.pages, args.rows, args.layout, args.repeat, args.history_rows)
+    print_table(results)
+
+    if args.compare:
+        regressions = compare(load_baseline(args.baseline), SUITE, results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+    if args.record:
+        write_baseline(args.baseline, SUITE, results, params)
+        print(f"Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# serialization.py
+"""
+Response size and encode time for the /extract-transactions payload of a
+5,000-row statement: the previous jsonable_encoder + JSONResponse path against
+FastJSONResponse, each with the full and the compact schema.
+
+    python -m benchmarks.serialization --rows 5000
+    python -m benchmarks.serialization --record
+"""
+import argparse
+import sys
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.responses import FastJSONResponse
+from app.utils.transactions.anomalies import score_transactions
+from app.utils.transactions.categories import compact_transactions, enrich_transactions
+from benchmarks.harness import DEFAULT_BASELINE, compare, load_baseline, measure, print_table, write_baseline
+from benchmarks.synthetic_pdf import generate_rows
+
+SUITE = "serialization"
+
+
+def statement_payload(rows: int) -> list:
+    """Enriched, scored transactions as parse_transactions holds them before responding."""
+    df = pd.DataFrame(generate_rows(rows, seed=11))[["date", "description", "debit", "credit", "amount", "balance"]]
+    df["date"] = df["date"].astype(str)
+    transactions = enrich_transactions(df)
+    for txn in transactions:
+        txn["user_id"] = "00000000-0000-0000-0000-000000000000"
+    transactions, _ = score_transactions(transactions)
+    return transactions
+
+
+def run(rows: int, repeat: int) -> dict:
+    transactions = statement_payload(rows)
+    anomaly_count = sum(1 for txn in transactions if txn["anomaly"])
+    payloads = {
+        "full": lambda: {"transactions": transactions, "anomaly_count": anomaly_count},
+        "compact": lambda: {"transactions": compact_transactions(transactions), "anomaly_count": anomaly_count},
+    }
+    encoders = {
+        "jsonable_encoder": lambda content: JSONResponse(content=jsonable_encoder(content)).body,
+        "fast_json": lambda content: FastJSONResponse(content).body,
+    }
+
+    results = {}
+    for schema, build in payloads.items():
+        for encoder, encode in encoders.items():
+            name = f"{encoder}_{schema}"
+            # Building the compact view is part of the cost of serving it
+            results[name] = measure(lambda: encode(build()), repeat=repeat)
+            results[name]["rows"] = rows
+            results[name]["bytes"] = len(encode(build()))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transaction response serialization benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--record", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--compare", action="store_true", help="exit non-zero on regressions vs the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print_table(results)
+    print()
+    for name, r in results.items():
+        print(f"{name:<28}{r['bytes'] / 1024:>10.1f} KiB")
+
+    if args.compare:
+        regressions = compare(load_baseline(args.baseline), SUITE, results, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+    if args.record:
+        write_baseline(args.baseline, SUITE, results, {"rows": args.rows, "repeat": args.repeat})
+        print(f"Baseline written to {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
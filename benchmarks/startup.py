@@ -0,0 +1,87 @@
+# startup.py
+"""
+Import-time budget check. Imports `app.main` in a fresh interpreter with no
+credentials configured and reports wall time and peak RSS, optionally including
+the lifespan warm-up. Exits non-zero when the import exceeds its budget.
+
+    python -m benchmarks.startup --max-import-ms 1500 --max-rss-mb 120
+    python -m benchmarks.startup --warmup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import DEFAULT_BASELINE, summarize, write_baseline
+
+SUITE = "startup"
+
+PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app.main
+import_ms = (time.perf_counter() - started) * 1000
+import_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+warmup_ms = None
+if sys.argv[1] == "1":
+    started = time.perf_counter()
+    from app.startup import warm_up
+    warm_up()
+    warmup_ms = (time.perf_counter() - started) * 1000
+heavy = [m for m in ("pandas", "numpy", "pdfplumber", "fitz", "openai", "supabase", "google.generativeai") if m in sys.modules]
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+print(json.dumps({"import_ms": import_ms, "import_rss_mb": import_rss_mb, "warmup_ms": warmup_ms,
+                  "rss_mb": rss_mb, "heavy_modules": heavy}))
+"""
+
+
+def probe(warmup: bool) -> dict:
+    # Strip credentials so the check also proves the app imports without them
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("OPENAI_API_KEY", "GEMINI_API_KEY", "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY")}
+    out = subprocess.run([sys.executable, "-c", PROBE, "1" if warmup else "0"], env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="App startup time and memory budget check")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--warmup", action="store_true", help="also run the lifespan warm-up")
+    parser.add_argument("--max-import-ms", type=float, default=float(os.getenv("STARTUP_BUDGET_MS", 1500)))
+    parser.add_argument("--max-rss-mb", type=float, default=float(os.getenv("STARTUP_BUDGET_RSS_MB", 150)))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--record", action="store_true")
+    args = parser.parse_args()
+
+    samples = [probe(args.warmup) for _ in range(args.runs)]
+    import_stats = summarize([s["import_ms"] for s in samples])
+    rss_mb = max(s["import_rss_mb"] for s in samples)
+    print(f"import app.main: p50 {import_stats['p50_ms']:.1f} ms, max {import_stats['max_ms']:.1f} ms, peak RSS {rss_mb:.1f} MB")
+    if args.warmup:
+        warmup_stats = summarize([s["warmup_ms"] for s in samples])
+        warmup_stats["rss_mb"] = round(max(s["rss_mb"] for s in samples), 1)
+        print(f"warm-up: p50 {warmup_stats['p50_ms']:.1f} ms, peak RSS {warmup_stats['rss_mb']:.1f} MB")
+    print(f"heavy modules loaded: {', '.join(samples[-1]['heavy_modules']) or 'none'}")
+
+    failures = []
+    if import_stats["p50_ms"] > args.max_import_ms:
+        failures.append(f"import time {import_stats['p50_ms']:.1f} ms exceeds budget {args.max_import_ms:.0f} ms")
+    if rss_mb > args.max_rss_mb:
+        failures.append(f"peak RSS {rss_mb:.1f} MB exceeds budget {args.max_rss_mb:.0f} MB")
+
+    if args.record:
+        results = {"import_app_main": {**import_stats, "rss_mb": round(rss_mb, 1)}}
+        if args.warmup:
+            results["warm_up"] = warmup_stats
+        write_baseline(args.baseline, SUITE, results, {"runs": args.runs, "warmup": args.warmup})
+        print(f"Baseline written to {args.baseline}")
+    for line in failures:
+        print(f"OVER BUDGET {line}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
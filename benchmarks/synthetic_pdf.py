@@ -0,0 +1,180 @@
+# synthetic_pdf.py
+"""
+Generates fake bank-statement PDFs for benchmarks and load tests.
+
+The statements are drawn with ruled table grids so pdfplumber's table finder
+picks them up the same way it does for real statements.
+
+    python -m benchmarks.synthetic_pdf out.pdf --pages 10 --rows 30 --layout hdfc
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import fitz  # PyMuPDF
+
+# ---------------- Bank layouts ----------------
+# Each layout lists (header, width) pairs plus how amounts and dates are written.
+# "fields" says which synthetic value goes in each column.
+BANK_LAYOUTS: Dict[str, dict] = {
+    "hdfc": {
+        "producer": "HDFC Bank Statement Generator",
+        "columns": [("Date", 50), ("Narration", 200), ("Chq./Ref.No.", 80), ("Value Dt", 50),
+                    ("Withdrawal Amt.", 60), ("Deposit Amt.", 60), ("Closing Balance", 65)],
+        "fields": ["date", "description", "ref", "date", "debit", "credit", "balance"],
+        "date_format": "%d/%m/%y",
+    },
+    "sbi": {
+        "producer": "SBI Account Statement",
+        "columns": [("Txn Date", 60), ("Value Date", 60), ("Particulars", 210), ("Ref No./Cheque No.", 80),
+                    ("Withdrawal", 60), ("Deposit", 60), ("Balance", 65)],
+        "fields": ["date", "date", "description", "ref", "debit", "credit", "balance"],
+        "date_format": "%d-%m-%Y",
+    },
+    "icici": {
+        "producer": "ICICI Bank iMobile",
+        "columns": [("S No.", 30), ("Transaction Date", 65), ("Transaction Remarks", 230),
+                    ("Withdrawal (INR)", 70), ("Deposit (INR)", 70), ("Balance (INR)", 70)],
+        "fields": ["serial", "date", "description", "debit", "credit", "balance"],
+        "date_format": "%d/%m/%Y",
+    },
+    "signed": {
+        "producer": "Generic Core Banking",
+        "columns": [("Txn Date", 70), ("Details", 290), ("Amount", 85), ("Balance", 90)],
+        "fields": ["date", "description", "amount", "balance"],
+        "date_format": "%d/%m/%Y",
+    },
+}
+
+# (template, min amount, max amount, is_credit)
+DESCRIPTION_TEMPLATES = [
+    ("UPIOUT/{ref}/{merchant}@okaxis/Payment/{mcc}", 50, 2500, False),
+    ("UPI/DR/{ref}/{merchant}@ybl/UPI", 20, 1500, False),
+    ("UPI IN/{ref}/{person}@oksbi/Received", 100, 5000, True),
+    ("NEFT CR-{ref}-ACME TECHNOLOGIES PVT LTD-SALARY", 60000, 90000, True),
+    ("NFT/{ref}/RENT {person}", 15000, 25000, False),
+    ("ACH D- BSE LTD SIP {ref}", 2000, 10000, False),
+    ("POS {ref} {merchant} STORE/{mcc}", 200, 6000, False),
+    ("IFN/{ref}/INTEREST CREDIT", 10, 500, True),
+    ("VisaDRefund {merchant} {ref}", 100, 2000, True),
+]
+MERCHANTS = ["swiggy", "zomato", "amazon", "flipkart", "bigbasket", "uber", "ola", "netflix", "irctc", "dmart"]
+PEOPLE = ["ravi.kumar", "priya.s", "anil99", "meena.r", "rahul.k"]
+MCCS = ["5812", "5411", "4111", "5311", "5814", "4814", "5912"]
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 20
+ROW_HEIGHT = 14
+FONT_SIZE = 6
+
+
+# ---------------- Synthetic rows ----------------
+def generate_rows(count: int, seed: int = 42, start: Optional[date] = None, opening_balance: float = 50000.0) -> List[dict]:
+    rng = random.Random(seed)
+    day = start or date(2024, 1, 1)
+    balance = opening_balance
+    rows = []
+    for i in range(count):
+        template, lo, hi, is_credit = rng.choice(DESCRIPTION_TEMPLATES)
+        amount = round(rng.uniform(lo, hi), 2)
+        balance = round(balance + amount if is_credit else balance - amount, 2)
+        rows.append({
+            "serial": i + 1,
+            "date": day,
+            "description": template.format(
+                ref=rng.randint(10**9, 10**12 - 1),
+                merchant=rng.choice(MERCHANTS),
+                person=rng.choice(PEOPLE),
+                mcc=rng.choice(MCCS),
+            ),
+            "ref": str(rng.randint(10**7, 10**8 - 1)),
+            "debit": None if is_credit else amount,
+            "credit": amount if is_credit else None,
+            "amount": amount if is_credit else -amount,
+            "balance": balance,
+        })
+        if rng.random() < 0.3:
+            day += timedelta(days=1)
+    return rows
+
+
+def _format_cell(field: str, row: dict, date_format: str) -> str:
+    value = row[field]
+    if value is None:
+        return ""
+    if field == "date":
+        return value.strftime(date_format)
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
+
+
+def _fit(text: str, width: float) -> str:
+    # Truncate so text never bleeds into the next cell
+    max_chars = max(1, int(width / (FONT_SIZE * 0.5)))
+    return text if len(text) <= max_chars else text[:max_chars]
+
+
+# ---------------- PDF rendering ----------------
+def generate_statement_pdf(pages: int = 3, rows_per_page: int = 30, layout: str = "hdfc", seed: int = 42) -> bytes:
+    """Returns the bytes of a statement PDF with `pages * rows_per_page` transactions."""
+    if layout not in BANK_LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'. Choose one of: {', '.join(BANK_LAYOUTS)}")
+    spec = BANK_LAYOUTS[layout]
+    max_rows = int((PAGE_HEIGHT - 2 * MARGIN - 60) / ROW_HEIGHT) - 1
+    rows_per_page = min(rows_per_page, max_rows)
+    rows = generate_rows(pages * rows_per_page, seed=seed)
+
+    doc = fitz.open()
+    doc.set_metadata({"producer": spec["producer"], "title": f"{layout.upper()} account statement"})
+    widths = [w for _, w in spec["columns"]]
+    xs = [MARGIN]
+    for w in widths:
+        xs.append(xs[-1] + w)
+
+    for p in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        page.insert_text((MARGIN, MARGIN + 10), f"Statement of account - page {p + 1}", fontsize=9)
+        page.insert_text((MARGIN, MARGIN + 24), "Account No: XXXXXXXX1234   Branch: MUMBAI MAIN", fontsize=7)
+
+        chunk = rows[p * rows_per_page:(p + 1) * rows_per_page]
+        top = MARGIN + 40
+        lines = [[h for h, _ in spec["columns"]]]
+        lines += [[_format_cell(f, r, spec["date_format"]) for f in spec["fields"]] for r in chunk]
+
+        for i, cells in enumerate(lines):
+            y = top + i * ROW_HEIGHT
+            for j, text in enumerate(cells):
+                page.insert_text((xs[j] + 2, y + ROW_HEIGHT - 4), _fit(text, widths[j]), fontsize=FONT_SIZE)
+
+        # Ruled grid so the lattice table finder sees one table per page
+        bottom = top + len(lines) * ROW_HEIGHT
+        for i in range(len(lines) + 1):
+            y = top + i * ROW_HEIGHT
+            page.draw_line((xs[0], y), (xs[-1], y), width=0.5)
+        for x in xs:
+            page.draw_line((x, top), (x, bottom), width=0.5)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic bank statement PDF")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=30, help="transactions per page")
+    parser.add_argument("--layout", choices=sorted(BANK_LAYOUTS), default="hdfc")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    data = generate_statement_pdf(args.pages, args.rows, args.layout, args.seed)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"Wrote {args.output} ({len(data)} bytes, {args.pages * args.rows} rows, layout={args.layout})")
+
+
+if __name__ == "__main__":
+    main()
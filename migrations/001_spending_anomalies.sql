@@ -0,0 +1,16 @@
+-- Streaming spending-anomaly detection (see app/utils/transactions/anomalies.py)
+
+-- Per-transaction anomaly details written at ingestion time; NULL when nothing was unusual
+alter table public.transactions
+    add column if not exists anomaly jsonb;
+
+create index if not exists transactions_user_anomaly_idx
+    on public.transactions (user_id)
+    where anomaly is not null;
+
+-- Running per-user statistics (Welford mean/variance per category, seen payees, last balance)
+create table if not exists public.user_spending_stats (
+    user_id uuid primary key,
+    stats jsonb not null,
+    updated_at timestamptz not null default now()
+);
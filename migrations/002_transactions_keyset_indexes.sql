@@ -0,0 +1,9 @@
+-- Indexes for GET /finance/transactions (keyset pagination on (txn_date, id) per user)
+
+-- Main listing and date-range filters: WHERE user_id = $1 AND (txn_date, id) > ($2, $3) ORDER BY txn_date, id
+create index if not exists transactions_user_date_id_idx
+    on public.transactions (user_id, txn_date, id);
+
+-- Category filter on the enriched category stored in the jsonb column
+create index if not exists transactions_user_category_date_id_idx
+    on public.transactions (user_id, (category->>'category'), txn_date, id);
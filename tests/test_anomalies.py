@@ -0,0 +1,123 @@
+import math
+import random
+
+import pytest
+
+from app.utils.transactions.anomalies import (
+    MIN_PAYEE_HISTORY,
+    STATS_VERSION,
+    _std,
+    _welford_update,
+    fold_transactions,
+    new_stats,
+    score_transaction,
+    score_transactions,
+)
+
+
+def debit(amount, description="POS 1234 DMART STORE/5411", category="Grocery Stores", balance=None):
+    return {"description": description, "debit": amount, "credit": None, "amount": -amount, "balance": balance,
+            "categories": {"category": category, "transaction_type": "Unknown", "counterparty": None}}
+
+
+def test_welford_matches_two_pass_statistics():
+    rng = random.Random(3)
+    values = [rng.uniform(10, 5000) for _ in range(500)]
+    acc = {"n": 0, "mean": 0.0, "m2": 0.0}
+    for x in values:
+        _welford_update(acc, x)
+    mean = sum(values) / len(values)
+    variance = sum((x - mean) ** 2 for x in values) / (len(values) - 1)
+    assert acc["n"] == len(values)
+    assert acc["mean"] == pytest.approx(mean)
+    assert _std(acc) == pytest.approx(math.sqrt(variance))
+
+
+def test_amount_spike_flagged_against_category_history():
+    stats = new_stats()
+    for amount in (900, 1000, 1100, 950, 1050, 1000):
+        assert score_transaction(debit(amount), stats) is None
+    anomaly = score_transaction(debit(6000), stats)
+    assert anomaly["flags"] == ["amount_spike"]
+    assert anomaly["category"] == "Grocery Stores"
+    assert anomaly["z_score"] >= 3
+
+
+def test_small_debits_and_short_history_never_flagged():
+    stats = new_stats()
+    for amount in (100, 110, 90, 105):
+        score_transaction(debit(amount), stats)
+    # Too little category history to trust a z-score
+    assert score_transaction(debit(5000), stats) is None
+    for amount in (100, 110, 90, 105, 95):
+        score_transaction(debit(amount), stats)
+    # Huge z-score but below the minimum amount
+    assert score_transaction(debit(400), stats) is None
+
+
+def test_new_payee_flagged_only_after_enough_history():
+    stats = new_stats()
+    for i in range(MIN_PAYEE_HISTORY - 1):
+        score_transaction(debit(1000, description=f"UPIOUT/{i}/shop@okaxis/Payment", category=f"c{i % 3}"), stats)
+    first = debit(5000, description="UPIOUT/1/newshop@okaxis/Payment", category="Other")
+    first["categories"]["counterparty"] = "newshop@okaxis"
+    assert score_transaction(first, stats) is None  # one short of MIN_PAYEE_HISTORY
+
+    second = debit(5000, description="UPIOUT/2/another@okaxis/Payment", category="Other2")
+    second["categories"]["counterparty"] = "another@okaxis"
+    anomaly = score_transaction(second, stats)
+    assert anomaly["flags"] == ["new_payee"]
+    assert anomaly["payee"] == "another@okaxis"
+
+    # Same payee again is no longer new
+    again = dict(second, categories=dict(second["categories"]))
+    assert score_transaction(again, stats) is None
+
+
+def test_balance_drop_flagged():
+    stats = new_stats()
+    score_transaction({"description": "SALARY", "debit": None, "credit": 50000, "amount": 50000,
+                       "balance": 50000, "categories": {}}, stats)
+    anomaly = score_transaction(debit(30000, balance=20000), stats)
+    assert "balance_drop" in anomaly["flags"]
+    assert anomaly["previous_balance"] == 50000
+    assert anomaly["balance_drop_pct"] == 60.0
+
+
+def test_score_transactions_resets_stats_from_another_version():
+    txns, stats = score_transactions([debit(100)], {"version": STATS_VERSION + 1, "overall": {"n": 99}})
+    assert stats["version"] == STATS_VERSION
+    assert stats["overall"]["n"] == 1
+    assert txns[0]["anomaly"] is None
+
+
+def test_fold_transactions_merges_without_rescoring():
+    txns, _ = score_transactions([debit(1000), debit(2000)])
+    txns[0]["anomaly"] = {"score": 9.0, "flags": ["kept"]}
+    other, _ = score_transactions([debit(3000)])
+    _, base = score_transactions(other)
+
+    merged = fold_transactions(txns, base)
+    assert merged["overall"]["n"] == 3
+    assert merged["overall"]["mean"] == pytest.approx(2000)
+    assert txns[0]["anomaly"] == {"score": 9.0, "flags": ["kept"]}
+
+
+def credit(amount, balance):
+    return {"description": "NEFT CR SALARY", "debit": None, "credit": amount, "amount": amount, "balance": balance,
+            "categories": {}}
+
+
+def test_balance_drop_ignores_row_order_within_a_day():
+    # Statement order: 10,000 -> debit 600 -> credit 40,000 -> debit 800. Sorted by amount, the
+    # 600 debit follows the credit, yet it only took 6% of its own opening balance.
+    rows = [credit(40000, 49400), debit(800, balance=48600), debit(600, balance=9400)]
+    txns, _ = score_transactions(rows)
+    assert [t["anomaly"] for t in txns] == [None, None, None]
+
+
+def test_balance_drop_ignores_balance_from_previous_upload():
+    _, stats = score_transactions([credit(90000, 100000)])
+    txns, stats = score_transactions([debit(1000, balance=15000)], stats)
+    assert txns[0]["anomaly"] is None
+    assert "last_balance" not in stats
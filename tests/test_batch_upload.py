@@ -0,0 +1,108 @@
+import io
+import time
+import zipfile
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.utils import auth
+from app.utils.transactions import read_pdf
+from benchmarks.fake_services import start_fake_services, service_env
+from benchmarks.synthetic_pdf import generate_statement_pdf
+
+URL = "/finance/extract-transactions/batch"
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """App client against the fake PostgREST, authenticated as user u1."""
+    services = start_fake_services()
+    env = service_env(services)
+    monkeypatch.setattr(config, "SUPABASE_URL", env["SUPABASE_URL"])
+    monkeypatch.setattr(config, "SUPABASE_KEY", env["SUPABASE_SERVICE_ROLE_KEY"])
+    monkeypatch.setattr(auth, "SECRET", "test-secret")
+    config.get_supabase.cache_clear()
+    token = jwt.encode({"sub": "u1", "aud": "authenticated", "exp": int(time.time()) + 600}, "test-secret",
+                       algorithm="HS256")
+    client = TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    client.store = services["supabase"].store
+    yield client
+    config.get_supabase.cache_clear()
+    for service in services.values():
+        service.stop()
+
+
+def statement(seed):
+    return generate_statement_pdf(pages=1, rows_per_page=12, layout="hdfc", seed=seed)
+
+
+def zipped(entries):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def pdf_files(*named):
+    return [("files", (name, data, "application/pdf")) for name, data in named]
+
+
+def test_overlapping_statements_deduplicated(client):
+    first, second = statement(1), statement(2)
+    response = client.post(URL, files=pdf_files(("jan.pdf", first), ("jan-copy.pdf", first), ("feb.pdf", second)))
+    assert response.status_code == 200, response.text
+    body = response.json()
+
+    rows = {r["filename"]: r["rows"] for r in body["statements"]}
+    assert rows["jan.pdf"] == rows["jan-copy.pdf"] > 0
+    assert body["duplicates_removed"] == rows["jan.pdf"]
+    assert len(body["transactions"]) == rows["jan.pdf"] + rows["feb.pdf"]
+    dates = [t["date"] for t in body["transactions"]]
+    assert dates == sorted(dates)
+    assert len(client.store.tables["transactions"]) == len(body["transactions"])
+
+
+def test_zip_skips_non_pdfs_and_macos_metadata(client):
+    archive = zipped([("statements/jan.pdf", statement(1)), ("__MACOSX/statements/._jan.pdf", b"\x00\x05"),
+                      ("statements/readme.txt", b"hello")])
+    response = client.post(URL, files=[("files", ("statements.zip", archive, "application/zip"))])
+    assert response.status_code == 200, response.text
+    assert [r["filename"] for r in response.json()["statements"]] == ["jan.pdf"]
+
+
+def test_statement_count_limit_covers_zips_and_plain_files(client, monkeypatch):
+    monkeypatch.setattr(read_pdf, "BATCH_MAX_FILES", 2)
+    archive = zipped([("a.pdf", b"%PDF-1.4"), ("b.pdf", b"%PDF-1.4")])
+    response = client.post(URL, files=pdf_files(("c.pdf", b"%PDF-1.4")) + [("files", ("more.zip", archive, "application/zip"))])
+    assert response.status_code == 400
+    assert "At most 2 statements" in response.json()["detail"]
+
+    response = client.post(URL, files=pdf_files(*[(f"{i}.pdf", b"%PDF-1.4") for i in range(3)]))
+    assert response.status_code == 400
+
+
+def test_total_size_limit_covers_plain_files(client, monkeypatch):
+    monkeypatch.setattr(read_pdf, "BATCH_MAX_UNZIPPED_BYTES", 1000)
+    response = client.post(URL, files=pdf_files(("a.pdf", b"x" * 600), ("b.pdf", b"x" * 600)))
+    assert response.status_code == 400
+    assert "in total" in response.json()["detail"]
+
+    archive = zipped([("big.pdf", b"x" * 5000)])  # compresses well below the limit
+    response = client.post(URL, files=[("files", ("big.zip", archive, "application/zip"))])
+    assert response.status_code == 400
+
+
+def test_unreadable_statement_reported_per_file(client):
+    response = client.post(URL, files=pdf_files(("jan.pdf", statement(1)), ("broken.pdf", b"not a pdf at all")))
+    assert response.status_code == 200, response.text
+    report = {r["filename"]: r for r in response.json()["statements"]}
+    assert report["jan.pdf"]["rows"] > 0 and report["jan.pdf"]["error"] is None
+    assert report["broken.pdf"]["rows"] == 0 and report["broken.pdf"]["error"]
+
+    response = client.post(URL, files=pdf_files(("broken.pdf", b"not a pdf at all")))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "None of the statements could be parsed"
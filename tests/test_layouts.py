@@ -0,0 +1,153 @@
+import pytest
+
+from app.utils.transactions import layouts, read_pdf
+
+fitz = pytest.importorskip("fitz")
+
+COLUMNS = [("Date", 60), ("Narration", 200), ("Withdrawal", 70), ("Deposit", 70), ("Balance", 80)]
+
+
+def centred_statement(start, rows=8, producer="Wrapped Bank Statements", left=30):
+    """Ruled statement whose two-line narrations are vertically centred on single-line date and amount cells."""
+    doc = fitz.open()
+    doc.set_metadata({"producer": producer})
+    page = doc.new_page(width=595, height=842)
+    xs = [left]
+    for _, width in COLUMNS:
+        xs.append(xs[-1] + width)
+    top, header_height, row_height = 60, 16, 26
+    for x, (header, _) in zip(xs, COLUMNS):
+        page.insert_text((x + 2, top + 11), header, fontsize=7)
+
+    balance = 100000.0
+    for i in range(rows):
+        n = start + i
+        middle = top + header_height + (i + 0.5) * row_height
+        balance -= 100.0 + n
+        page.insert_text((xs[0] + 2, middle + 2.5), f"{i + 1:02d}/03/2024", fontsize=7)
+        page.insert_text((xs[1] + 2, middle - 2), f"UPIOUT/{900000 + n}/shop{n}@okaxis", fontsize=7)
+        page.insert_text((xs[1] + 2, middle + 7), f"PAYMENT FOR ORDER {n}", fontsize=7)
+        page.insert_text((xs[2] + 2, middle + 2.5), f"{100.0 + n:,.2f}", fontsize=7)
+        page.insert_text((xs[4] + 2, middle + 2.5), f"{balance:,.2f}", fontsize=7)
+
+    bottom = top + header_height + rows * row_height
+    for y in [top] + [top + header_height + i * row_height for i in range(rows + 1)]:
+        page.draw_line((xs[0], y), (xs[-1], y), width=0.5)
+    for x in xs:
+        page.draw_line((x, top), (x, bottom), width=0.5)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = layouts.LayoutStore(path=None)
+    monkeypatch.setattr(layouts, "layout_store", store)
+    monkeypatch.setattr(read_pdf, "LAYOUT_TEMPLATES_ENABLED", True)
+    return store
+
+
+def generic_parse(pdf_bytes, monkeypatch):
+    with monkeypatch.context() as m:
+        m.setattr(read_pdf, "LAYOUT_TEMPLATES_ENABLED", False)
+        return read_pdf.extract_transactions_from_bytes(pdf_bytes)
+
+
+def normalized(descriptions):
+    return [" ".join(d.split()) for d in descriptions]
+
+
+def test_centred_wrapped_narrations_match_generic_parse(store, monkeypatch):
+    read_pdf.extract_transactions_from_bytes(centred_statement(0))
+    (template,) = store.summary()
+    assert not template["rejected"]
+
+    statement = centred_statement(100)
+    expected = generic_parse(statement, monkeypatch)
+    rows = layouts.extract_with_template(statement)
+    assert rows is not None
+    actual = read_pdf.rows_to_frame(rows)
+    assert normalized(actual["description"]) == normalized(expected["description"])
+    assert actual["description"][0] == "UPIOUT/900100/shop100@okaxis PAYMENT FOR ORDER 100"
+    assert actual[["date", "debit", "balance"]].equals(expected[["date", "debit", "balance"]])
+
+
+def test_template_rejected_when_descriptions_differ(store, monkeypatch):
+    statement = centred_statement(0)
+    expected = generic_parse(statement, monkeypatch)
+    expected["description"] = expected["description"].str.split("\n").str[0]
+    assert layouts.learn_template(statement, expected)["rejected"]
+
+
+def test_layouts_sharing_header_text_keep_separate_templates(store, monkeypatch):
+    narrow, wide = centred_statement(0), centred_statement(0, left=60)
+    read_pdf.extract_transactions_from_bytes(narrow)
+    read_pdf.extract_transactions_from_bytes(wide)
+    assert len(store.summary()) == 2
+
+    for _ in range(2):
+        for start, left in ((100, 30), (200, 60)):
+            statement = centred_statement(start, left=left)
+            rows = layouts.extract_with_template(statement)
+            assert rows is not None
+            assert rows[0]["description"] == f"UPIOUT/{900000 + start}/shop{start}@okaxis PAYMENT FOR ORDER {start}"
+    assert sorted(t["hits"] for t in store.summary()) == [2, 2]
+
+
+def test_template_dropped_only_after_consecutive_misses(store):
+    store.put({"version": layouts.TEMPLATE_VERSION, "id": "fp", "fingerprint": "fp", "producer": "p", "hits": 0})
+    for _ in range(layouts.LAYOUT_MAX_MISSES - 1):
+        assert not store.record_miss("fp")
+    store.record_hit("fp")
+    for _ in range(layouts.LAYOUT_MAX_MISSES - 1):
+        assert not store.record_miss("fp")
+    assert store.get("fp")
+    assert store.record_miss("fp")
+    assert store.get("fp") is None
+
+
+def test_rejected_layout_relearned_after_backoff(store, monkeypatch):
+    statement = centred_statement(0)
+    expected = generic_parse(statement, monkeypatch)
+    wrong = expected.assign(description="something else")
+
+    first = layouts.learn_template(statement, wrong)
+    assert first["rejected"] and first["rejections"] == 1
+    assert layouts.learn_template(statement, expected) is None  # still backing off
+
+    store.get(first["id"])["rejected_until"] = 0
+    second = layouts.learn_template(statement, wrong)
+    assert second["rejections"] == 2
+    assert second["rejected_until"] - second["learned_at"] == pytest.approx(2 * layouts.LAYOUT_REJECT_SECONDS, abs=1)
+
+    store.get(first["id"])["rejected_until"] = 0
+    learned = layouts.learn_template(statement, expected)
+    assert not learned.get("rejected")
+    assert layouts.extract_with_template(centred_statement(100)) is not None
+
+
+def test_template_errors_fall_back_to_generic_parse(store, monkeypatch):
+    read_pdf.extract_transactions_from_bytes(centred_statement(0))
+    (summary,) = store.summary()
+    del store.get(summary["id"])["columns"]  # e.g. a damaged STATEMENT_LAYOUTS_PATH file
+
+    statement = centred_statement(100)
+    expected = generic_parse(statement, monkeypatch)
+    for _ in range(layouts.LAYOUT_MAX_MISSES):
+        assert read_pdf.extract_transactions_from_bytes(statement).equals(expected)
+    assert store.get(summary["id"]) is None or "columns" in store.get(summary["id"])
+
+    def broken_reader(pdf_bytes, max_pages=None):
+        raise RuntimeError("cannot open document")
+    monkeypatch.setattr(layouts, "read_words", broken_reader)
+    assert layouts.extract_with_template(statement) is None
+
+
+def test_small_header_drift_reuses_template(store, monkeypatch):
+    read_pdf.extract_transactions_from_bytes(centred_statement(0))
+    for left in (29.2, 31, 32.9):
+        assert layouts.extract_with_template(centred_statement(100, left=left)) is not None
+        read_pdf.extract_transactions_from_bytes(centred_statement(100, left=left))
+    (template,) = store.summary()
+    assert template["hits"] == 6
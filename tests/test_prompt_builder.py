@@ -0,0 +1,74 @@
+import pytest
+
+from app.utils.prompt_builder import MarketDigestCache, build_advice_prompt, build_market_digest
+
+MARKET_DATA = {
+    "nse_most_active": [{"company": f"Stock {i}", "price": 100.0 + i, "percent_change": 0.5, "overall_rating": "Bullish"}
+                        for i in range(5)],
+    "popular_mutual_funds": [{"fund_name": f"Fund {i}", "1_year_return": 20.0 - i, "3_year_return": 15.0}
+                             for i in range(5)],
+    "latest_news": [{"title": f"Headline {i}", "summary": "Markets moved on earnings and rate expectations. " * 6}
+                    for i in range(4)],
+}
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        return {"error": "timed out"} if self.fail else MARKET_DATA
+
+
+def expire(cache):
+    cache._digest["fetched_at"] -= cache.ttl_seconds + 1
+
+
+def test_fresh_digest_served_from_cache():
+    cache, upstream = MarketDigestCache(ttl_seconds=60, retry_seconds=30), Upstream()
+    first = cache.get(upstream)
+    assert cache.get(upstream) is first
+    assert upstream.calls == 1
+
+
+def test_failed_refresh_serves_stale_without_retrying_upstream():
+    cache, upstream = MarketDigestCache(ttl_seconds=60, retry_seconds=30), Upstream()
+    cache.get(upstream)
+    expire(cache)
+    upstream.fail = True
+
+    for _ in range(5):
+        digest = cache.get(upstream)
+        assert digest["stale"] is True
+    assert upstream.calls == 2  # one failed refresh, then served stale until the retry time
+
+    cache._retry_at = 0.0
+    upstream.fail = False
+    assert "stale" not in cache.get(upstream)
+    assert upstream.calls == 3
+
+
+def test_failure_with_nothing_cached_raises_until_retry_time():
+    cache, upstream = MarketDigestCache(ttl_seconds=60, retry_seconds=30), Upstream()
+    upstream.fail = True
+    for _ in range(3):
+        with pytest.raises(ValueError, match="timed out"):
+            cache.get(upstream)
+    assert upstream.calls == 1
+
+
+def test_prompt_trimmed_to_budget_least_valuable_first():
+    digest = build_market_digest(MARKET_DATA)
+    recurring = [{"payee": "netflix", "kind": "subscription", "frequency": "monthly", "amount": 649.0}]
+    summary = {"net_monthly_savings": 25000.0, "recurring_commitments": {"monthly_committed": 649.0}}
+
+    full, report = build_advice_prompt(digest, "Moderate", "Wealth", "5 years", summary, recurring, budget=10_000)
+    assert report["trimmed_items"] == {} and not report["over_budget"]
+
+    budget = report["prompt_tokens"] - 50
+    prompt, report = build_advice_prompt(digest, "Moderate", "Wealth", "5 years", summary, recurring, budget=budget)
+    assert report["prompt_tokens"] <= budget
+    assert list(report["trimmed_items"]) == ["news"]
+    assert "Fund 4" in prompt and "netflix" in prompt
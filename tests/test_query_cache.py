@@ -0,0 +1,60 @@
+import pytest
+
+from app.aimodels.query_cache import QueryCache
+
+ANSWER = "A generic explanation."
+
+
+@pytest.fixture
+def cache():
+    return QueryCache(enabled=True, ttl_seconds=60, max_entries=100)
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What is the tax on equity mutual funds held for less than one year?",
+     "What is the tax on equity mutual funds held for more than one year?"),
+    ("What is the maximum deduction under section 80C?", "What is the maximum deduction under section 80D?"),
+    ("What is the current repo rate set by the RBI?", "What is the current reverse repo rate set by the RBI?"),
+    ("What is a balanced advantage fund?", "What is a balanced advantage fund ratio?"),
+])
+def test_different_questions_miss(cache, cached, asked):
+    assert cache.store(cached, ANSWER)
+    assert cache.lookup(asked) is None
+    assert cache.stats["misses"] == 1
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What is SIP?", "what are SIPs"),
+    ("ELSS vs PPF", "Difference between PPF and ELSS?"),
+    ("Explain the meaning of an index fund", "What is an index fund?!"),
+])
+def test_rewordings_hit_exactly(cache, cached, asked):
+    cache.store(cached, ANSWER)
+    assert cache.lookup(asked) == ANSWER
+    assert cache.stats["exact_hits"] == 1
+
+
+@pytest.mark.parametrize("cached, asked", [
+    ("What is a mutual fund expense ratio?", "what is a mutual fund expnse ratio"),
+    ("How does a systematic withdrawal plan work?", "how does a systematic withdrawl plan work"),
+])
+def test_misspelling_hits_similar(cache, cached, asked):
+    cache.store(cached, ANSWER)
+    assert cache.lookup(asked) == ANSWER
+    assert cache.stats["similar_hits"] == 1
+
+
+def test_personal_queries_skipped(cache):
+    assert not cache.store("Should I move my savings into a SIP?", ANSWER)
+    assert not cache.store("Where to invest ₹ 50000 for a year", ANSWER)
+    cache.store("What is SIP?", ANSWER)
+    assert cache.lookup("What is SIP for me?") is None
+    assert cache.stats["skipped"] == 1
+    assert cache.lookup("Tell me what SIP is") == ANSWER
+
+
+def test_personal_answers_rejected(cache):
+    assert not cache.store("What is SIP?", "Based on your transactions you could start a SIP of 5,000.")
+    assert not cache.store("How much tax do I save?", "Your salary suggests...")
+    assert cache.stats["rejected_answers"] == 1
+    assert cache.lookup("What is SIP?") is None
@@ -0,0 +1,41 @@
+from app.routes import finance
+from app.utils.transactions.anomalies import score_transactions
+
+
+def debit(amount):
+    return {"description": "POS 1 DMART STORE/5411", "debit": amount, "credit": None, "amount": -amount,
+            "balance": None, "categories": {"category": "Grocery Stores"}}
+
+
+class VersionedStats:
+    """In-memory user_spending_stats row with the same compare-and-set semantics as the database helpers."""
+
+    def __init__(self):
+        self.stats, self.version, self.writes = None, None, 0
+
+    def get(self, user_id):
+        return self.stats, self.version
+
+    def save(self, user_id, stats, expected):
+        if expected != self.version:
+            return False
+        self.writes += 1
+        self.stats, self.version = stats, f"v{self.writes}"
+        return True
+
+
+def test_concurrent_uploads_do_not_lose_updates(monkeypatch):
+    row = VersionedStats()
+    monkeypatch.setattr(finance, "get_spending_stats", row.get)
+    monkeypatch.setattr(finance, "save_spending_stats", row.save)
+
+    # Both uploads read the same (empty) stats before either saves
+    first_stats, first_version = row.get("u1")
+    second_stats, second_version = row.get("u1")
+    first, first_new = score_transactions([debit(100), debit(200)], first_stats)
+    second, second_new = score_transactions([debit(300)], second_stats)
+
+    assert finance.store_spending_stats("u1", first, first_new, first_version)
+    assert finance.store_spending_stats("u1", second, second_new, second_version)
+    assert row.stats["overall"]["n"] == 3
+    assert row.writes == 2
@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import date, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from app import config
+from app.database import iter_transactions, query_transactions
+from app.routes.finance import decode_cursor, encode_cursor
+from benchmarks.fake_services import start_fake_services, service_env
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """Fake PostgREST seeded with 40 alternating debits/credits of growing size for user u1."""
+    services = start_fake_services()
+    env = service_env(services)
+    monkeypatch.setattr(config, "SUPABASE_URL", env["SUPABASE_URL"])
+    monkeypatch.setattr(config, "SUPABASE_KEY", env["SUPABASE_SERVICE_ROLE_KEY"])
+    config.get_supabase.cache_clear()
+    rows = []
+    for i in range(40):
+        value = 100.0 * (i + 1)
+        signed = value if i % 2 else -value
+        rows.append({"id": i + 1, "user_id": "u1", "txn_date": (date(2024, 1, 1) + timedelta(days=i // 3)).isoformat(),
+                     "description": f"txn {i}", "amount": signed, "debit": None if signed > 0 else value,
+                     "credit": signed if signed > 0 else None, "balance": None, "category": {"category": "Other"},
+                     "anomaly": None})
+    services["supabase"].store.tables["transactions"] = rows
+    yield rows
+    config.get_supabase.cache_clear()
+    for service in services.values():
+        service.stop()
+
+
+def test_min_amount_without_direction_filters_on_size(store):
+    rows = query_transactions("u1", limit=100, min_amount=1000)
+    assert len(rows) == 31
+    assert {r["amount"] > 0 for r in rows} == {True, False}
+    assert all(abs(r["amount"]) >= 1000 for r in rows)
+
+
+def test_amount_range_without_direction(store):
+    rows = query_transactions("u1", limit=100, min_amount=1000, max_amount=2000)
+    assert sorted(abs(r["amount"]) for r in rows) == [100.0 * n for n in range(10, 21)]
+
+
+def test_amount_range_with_direction(store):
+    rows = query_transactions("u1", limit=100, direction="debit", min_amount=1000, max_amount=2000)
+    assert rows and all(r["amount"] < 0 and 1000 <= r["debit"] <= 2000 for r in rows)
+
+
+def test_keyset_pages_combine_with_size_filter(store):
+    pages = list(iter_transactions("u1", page_size=7, min_amount=500))
+    seen = [(r["txn_date"], r["id"]) for page in pages for r in page]
+    assert len(seen) == 36
+    assert seen == sorted(seen)
+    assert len(set(seen)) == len(seen)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor({"txn_date": "2024-01-05", "id": 12})) == ("2024-01-05", 12)
+    uid = "5f0c6f5e-2f1b-4a7e-9f57-8d6d7c1a2b3c"
+    assert decode_cursor(encode_cursor({"txn_date": "2024-01-05", "id": uid})) == ("2024-01-05", uid)
+
+
+@pytest.mark.parametrize("payload", [
+    ["2024-01-05),amount.gt.(0", 1],
+    ["2024-01-05", "1,id.gt.0"],
+    ["2024-01-05", True],
+    ["2024-01-05", None],
+    ["not-a-date", 1],
+    {"txn_date": "2024-01-05"},
+])
+def test_tampered_cursor_rejected(payload):
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor)
+    assert exc.value.status_code == 400